@@ -17,13 +17,23 @@ else:
 
 from config import Config
 from extensions.extensions import db
+from extensions.routing import init_routing
+from extensions.checkin_cache import init_checkin_cache
+from extensions.profiling import init_profiling
+from extensions.qr_sheets import qr_cli
+from jobs.runner import jobs_cli
+import jobs.handlers  # Registers the job kinds
 from routes.routes import routes_bp  
 
-def create_app():
+def create_app(config_overrides=None):
     """Initializes the Flask app."""
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Allow tools (seeding, benchmarks) to point the app at another database
+    if config_overrides:
+        app.config.update(config_overrides)
+
     # Debugging: Print database URL
     print(f"🛠️ DATABASE_URL from .env: {os.getenv('DATABASE_URL')}")  
 
@@ -40,17 +50,26 @@ def create_app():
     db.init_app(app)
     Migrate(app, db)
     JWTManager(app)
+    init_routing(app)
+    init_checkin_cache(app)
+    init_profiling(app)
 
     # Register routes
     app.register_blueprint(routes_bp)
 
+    # Background worker: `flask --app app jobs work`
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(qr_cli)
+
     @app.after_request
     def add_cors_headers(response):
         """Add necessary CORS headers to each response."""
         response.headers["Access-Control-Allow-Origin"] = ",".join(cors_origins)
         response.headers["Access-Control-Allow-Credentials"] = "true"
         response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"  # Allow all HTTP methods
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Last-Write"
+        # Lets the frontend read the read-your-writes marker (extensions/routing.py)
+        response.headers["Access-Control-Expose-Headers"] = "X-Last-Write"
         return response
 
     # Ensure database connection works
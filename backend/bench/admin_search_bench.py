@@ -0,0 +1,82 @@
+"""Benchmark server-side admin filtering against the unfiltered dumps.
+
+Each scenario is run twice: once as the full listing the admin dashboard used
+to download, and once with the query parameters it now sends. The report
+compares bytes transferred and latency.
+
+Usage (from the backend directory, after ``python -m bench.seed``):
+    python -m bench.admin_search_bench --database-url sqlite:///bench.db
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from bench.harness import InProcessClient, run_load, run_metadata, write_report
+from bench.seed import build_app
+from models.models import User, Session
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Admin search/filter benchmark.")
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    app = build_app(args.database_url)
+    with app.app_context():
+        admin_token = create_access_token(identity=User.query.filter_by(role="admin").first().user_id)
+        student = User.query.filter_by(role="student").first()
+        instructor = User.query.filter_by(role="instructor").first()
+        session = Session.query.filter_by(instructor_id=instructor.user_id).order_by(Session.created_at.desc()).first()
+        day = session.created_at.date()
+
+    # (name, unfiltered path, filtered path)
+    cases = [
+        ("users_by_prefix", "/api/users", f"/api/users?q={student.username[:6]}&match=prefix"),
+        ("users_by_role", "/api/users", "/api/users?role=instructor"),
+        ("attendance_by_session", "/api/attendance", f"/api/attendance?session_id={session.session_id}"),
+        ("attendance_by_student", "/api/attendance", f"/api/attendance?student_id={student.user_id}"),
+        ("attendance_by_day", "/api/attendance", f"/api/attendance?from={day.isoformat()}&to={day.isoformat()}"),
+        ("sessions_by_instructor", "/api/sessions/all", f"/api/sessions/all?instructor_id={instructor.user_id}"),
+        ("sessions_by_name", "/api/sessions/all", "/api/sessions/all?q=week 1"),
+    ]
+
+    client = InProcessClient(app)
+    scenarios = {}
+    unfiltered_cache = {}
+    for name, full_path, filtered_path in cases:
+        # Full dumps are shared between cases; time each distinct one once
+        if full_path not in unfiltered_cache:
+            unfiltered_cache[full_path] = run_load(client, [
+                {"method": "GET", "path": full_path, "token": admin_token}
+                for _ in range(max(1, args.requests // 10))
+            ], args.concurrency)
+        scenarios[f"{name}_unfiltered"] = unfiltered_cache[full_path]
+        scenarios[f"{name}_filtered"] = run_load(client, [
+            {"method": "GET", "path": filtered_path, "token": admin_token} for _ in range(args.requests)
+        ], args.concurrency)
+
+    for name, _, _ in cases:
+        full = scenarios[f"{name}_unfiltered"]
+        filtered = scenarios[f"{name}_filtered"]
+        print(
+            f"{name:<26} bytes/req {full['bytes'] // full['requests']:>10} -> "
+            f"{filtered['bytes'] // filtered['requests']:<8} p50 ms "
+            f"{full['latency_ms']['p50']:>9} -> {filtered['latency_ms']['p50']}"
+        )
+
+    write_report({
+        "meta": run_metadata(database=app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0]),
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
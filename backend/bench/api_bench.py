@@ -0,0 +1,180 @@
+"""End-to-end API benchmark.
+
+Drives every endpoint with concurrent clients against a seeded database and
+emits a JSON report of throughput and latency percentiles per scenario.
+
+Usage (from the backend directory):
+    python -m bench.seed --database-url sqlite:///bench.db --reset
+    python -m bench.api_bench --database-url sqlite:///bench.db --output run.json
+    python -m bench.api_bench --database-url sqlite:///bench.db --compare run.json
+
+Pass ``--base-url http://localhost:5000`` to hit a running server instead of
+the in-process test client (``--database-url`` must point at the same DB).
+"""
+import argparse
+import json
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.harness import (
+    InProcessClient, HttpClient, run_load, run_metadata, write_report, compare_reports,
+)
+from bench.seed import build_app, seed, SEED_PASSWORD
+from extensions.extensions import db
+from models.models import User, Session, Attendance
+
+
+def login(client, email):
+    """Log in through the API and return the JWT."""
+    status, body, _ = client.request("POST", "/api/login", json_body={"email": email, "password": SEED_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"Login failed for {email}: {status} {body[:200]!r}")
+    return json.loads(body)["token"]
+
+
+def load_fixture(app, sample_size, rng):
+    """Pick the accounts and sessions the scenarios will use."""
+    with app.app_context():
+        students = [u.email for u in User.query.filter_by(role="student").limit(sample_size * 4).all()]
+        instructors = User.query.filter_by(role="instructor").all()
+        admin = User.query.filter_by(role="admin").first()
+        sessions_by_instructor = {}
+        for s in db.session.query(Session.session_id, Session.instructor_id).all():
+            sessions_by_instructor.setdefault(s.instructor_id, []).append(s.session_id)
+        counts = {
+            "users": User.query.count(),
+            "sessions": Session.query.count(),
+            "attendance": Attendance.query.count(),
+        }
+    if not students or not instructors or not admin:
+        raise SystemExit("❌ Database is not seeded; run `python -m bench.seed` first or pass --seed-if-empty.")
+    rng.shuffle(students)
+    return {
+        "students": students[:sample_size],
+        "instructors": [(i.email, sessions_by_instructor.get(i.user_id, [])) for i in instructors],
+        "admin": admin.email,
+        "counts": counts,
+    }
+
+
+def run(client, fixture, requests_per_scenario, concurrency, rng):
+    """Run every scenario and return a ``{name: summary}`` dict."""
+    results = {}
+    n = requests_per_scenario
+
+    # Login (password hashing dominates by design)
+    emails = fixture["students"] + [email for email, _ in fixture["instructors"]]
+    results["login"] = run_load(client, [
+        {"method": "POST", "path": "/api/login",
+         "json_body": {"email": rng.choice(emails), "password": SEED_PASSWORD}}
+        for _ in range(n)
+    ], concurrency)
+
+    # Tokens for the remaining scenarios
+    student_tokens = [login(client, email) for email in fixture["students"]]
+    instructor_tokens = [(login(client, email), codes) for email, codes in fixture["instructors"]]
+    admin_token = login(client, fixture["admin"])
+
+    # Instructors creating sessions
+    created = run_load(client, [
+        {"method": "POST", "path": "/api/sessions", "token": rng.choice(instructor_tokens)[0],
+         "json_body": {"name": "Benchmark Session"}}
+        for _ in range(n)
+    ], concurrency)
+    results["create_session"] = created
+
+    # A class checking in at once: every sampled student scans the same fresh session
+    token, _ = instructor_tokens[0]
+    status, body, _ = client.request("POST", "/api/sessions", json_body={"name": "Burst Session"}, token=token)
+    burst_code = json.loads(body)["session_id"]
+    results["mark_attendance_burst"] = run_load(client, [
+        {"method": "POST", "path": "/api/attendance", "token": t, "json_body": {"session_id": burst_code}}
+        for t in student_tokens
+    ], concurrency)
+
+    # Repeat scans of the same code (already marked)
+    results["mark_attendance_repeat"] = run_load(client, [
+        {"method": "POST", "path": "/api/attendance", "token": rng.choice(student_tokens),
+         "json_body": {"session_id": burst_code}}
+        for _ in range(n)
+    ], concurrency)
+
+    # Instructor dashboard reads
+    with_sessions = [(t, codes) for t, codes in instructor_tokens if codes]
+    results["get_sessions"] = run_load(client, [
+        {"method": "GET", "path": "/api/sessions", "token": rng.choice(instructor_tokens)[0]}
+        for _ in range(n)
+    ], concurrency)
+    view_calls = []
+    for _ in range(n):
+        t, codes = rng.choice(with_sessions)
+        view_calls.append({"method": "GET", "path": f"/api/attendance/{rng.choice(codes)}", "token": t})
+    results["view_attendance"] = run_load(client, view_calls, concurrency)
+
+    # QR rendering
+    qr_calls = []
+    for _ in range(n):
+        t, codes = rng.choice(with_sessions)
+        qr_calls.append({"method": "GET", "path": f"/api/qr/{rng.choice(codes)}", "token": t})
+    results["qr"] = run_load(client, qr_calls, concurrency)
+
+    # Admin listings return whole tables, so run fewer of them
+    admin_n = max(1, n // 10)
+    for name, path in (("admin_users", "/api/users"),
+                       ("admin_attendance", "/api/attendance"),
+                       ("admin_sessions", "/api/sessions/all")):
+        results[name] = run_load(client, [
+            {"method": "GET", "path": path, "token": admin_token} for _ in range(admin_n)
+        ], concurrency)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API endpoint.")
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--sample-students", type=int, default=50, help="Students taking part in the burst")
+    parser.add_argument("--seed-if-empty", action="store_true", help="Seed default data if the DB is empty")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="-", help="Report path, or - for stdout")
+    parser.add_argument("--compare", help="Previous report to diff against")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    app = build_app(args.database_url)
+    if args.seed_if_empty:
+        with app.app_context():
+            db.create_all()
+            if not User.query.first():
+                seed()
+
+    fixture = load_fixture(app, args.sample_students, rng)
+    client = HttpClient(args.base_url) if args.base_url else InProcessClient(app)
+    scenarios = run(client, fixture, args.requests, args.concurrency, rng)
+
+    report = {
+        "meta": run_metadata(
+            database=app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            target=args.base_url or "in-process",
+            concurrency=args.concurrency,
+            requests_per_scenario=args.requests,
+            rows=fixture["counts"],
+        ),
+        "scenarios": scenarios,
+    }
+    write_report(report, args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
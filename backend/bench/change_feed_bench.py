@@ -0,0 +1,350 @@
+"""Incremental sync through /api/changes versus downloading everything again.
+
+Seeds an institution, records the feed version, then changes ``--change-rate``
+of the attendance rows through the API (half new check-ins, half deletions by
+an admin). It then compares what a client pays to catch up:
+
+* full: the admin listing (``GET /api/attendance``), or for an instructor
+  their sessions plus ``GET /api/attendance/<session>`` for each one
+* delta: ``GET /api/changes?since=<version>``, paged until ``has_more`` is false
+
+The delta is applied to the snapshot taken before the changes and must equal
+a fresh full download. Check-in latency is also measured with the change log
+hooks detached, and compaction is run to show the feed shrinking and stale
+clients getting 410.
+
+Finally a lecture-style burst: ``--burst-workers`` processes check the
+students into one session at once, with and without the change log, while an
+admin polls the feed; every check-in must come through the feed exactly as
+committed. Run it against a local PostgreSQL to see concurrent writers.
+
+Usage (from the backend directory):
+    python -m bench.change_feed_bench --database-url sqlite:///change_feed_bench.db
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+
+from app import create_app
+from bench.harness import InProcessClient, percentile, run_metadata, summarize, write_report
+from bench.seed import local_database_url, seed
+from extensions.extensions import db
+from extensions.routing import RoutingSession
+from jobs.runner import run, submit
+from models.models import Attendance, ChangeLog, Session, User, _log_flushed_changes
+
+SYNC_PAGE = 5000
+OVERHEAD_SAMPLES = 400
+# Seconds a burst may take, from starting the workers to the last report
+BURST_TIMEOUT = 600
+
+
+def full_admin(client, token):
+    """Every check-in, keyed by id, and the bytes it took."""
+    status, body, _ = client.request("GET", "/api/attendance", token=token)
+    assert status == 200, body[:200]
+    return {str(r["id"]): r for r in json.loads(body)}, len(body)
+
+
+def full_instructor(client, token):
+    """The instructor's check-ins via their sessions, and the bytes it took."""
+    _, body, _ = client.request("GET", "/api/sessions", token=token)
+    size = len(body)
+    rows = set()
+    for s in json.loads(body):
+        _, records, _ = client.request("GET", f"/api/attendance/{s['session_id']}", token=token)
+        size += len(records)
+        rows.update((r["student_id"], s["session_id"]) for r in json.loads(records)["attendance"])
+    return rows, size
+
+
+def delta(client, token, since):
+    """Every change after ``since``, the version to poll from next, and the bytes."""
+    changes, size = [], 0
+    while True:
+        status, body, _ = client.request("GET", f"/api/changes?since={since}&limit={SYNC_PAGE}", token=token)
+        assert status == 200, body[:200]
+        size += len(body)
+        page = json.loads(body)
+        changes.extend(page["changes"])
+        since = page["next_since"]
+        if not page["has_more"]:
+            return changes, since, size
+
+
+def timed(fn, repeat):
+    latencies, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - t0)
+    ms = sorted(x * 1000 for x in latencies)
+    return result, {"p50_ms": round(percentile(ms, 50), 2), "max_ms": round(ms[-1], 2)}
+
+
+def check_in(client, pairs, tokens):
+    """POST check-ins for ``(student_id, session_code)`` pairs; returns sorted latencies (ms)."""
+    latencies = []
+    for student_id, code in pairs:
+        t0 = time.perf_counter()
+        status, body, _ = client.request("POST", "/api/attendance", {"session_id": code}, token=tokens[student_id])
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert status == 201, body[:200]
+    return sorted(latencies)
+
+
+def _burst_worker(overrides, code, student_ids, logged, barrier, results):
+    """One process: check ``student_ids`` into session ``code`` as fast as possible."""
+    app = create_app(overrides)
+    if not logged:
+        event.remove(RoutingSession, "after_flush", _log_flushed_changes)
+    with app.app_context():
+        tokens = [create_access_token(identity=s) for s in student_ids]
+    client = InProcessClient(app)
+    # Times out (and exits non-zero) if another worker never gets here
+    barrier.wait(timeout=BURST_TIMEOUT)
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for token in tokens:
+        t0 = time.perf_counter()
+        status, _, _ = client.request("POST", "/api/attendance", {"session_id": code}, token=token)
+        latencies.append(time.perf_counter() - t0)
+        errors += status != 201
+    results.put((latencies, errors, time.perf_counter() - start))
+
+
+def check_in_burst(overrides, client, admin_token, instructor_token, students, workers, logged):
+    """Check every student into a new session from ``workers`` processes at once.
+
+    While they run, the admin polls the feed; returns the burst summary and
+    whether the polled check-ins match the committed ones.
+    """
+    _, body, _ = client.request("POST", "/api/sessions", {"name": "Burst"}, token=instructor_token)
+    code = json.loads(body)["session_id"]
+    _, body, _ = client.request("GET", "/api/changes", token=admin_token)
+    since = json.loads(body)["next_since"]
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_burst_worker, args=(overrides, code, students[w::workers], logged, barrier, results))
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+    seen, merged, errors, wall, done = set(), [], 0, 0.0, 0
+    deadline = time.monotonic() + BURST_TIMEOUT
+    while True:
+        # Poll during the burst; once every worker has reported, drain the feed
+        finished = done == workers
+        changes, since, _ = delta(client, admin_token, since)
+        seen.update(c["data"]["student_id"] for c in changes
+                    if c["entity"] == "attendance" and c["data"]["session_id"] == code)
+        if finished:
+            break
+        while not results.empty():
+            latencies, worker_errors, elapsed = results.get()
+            merged.extend(latencies)
+            errors += worker_errors
+            wall = max(wall, elapsed)
+            done += 1
+        # A worker that crashed never reports; don't wait for it forever
+        failed = [p.exitcode for p in procs if p.exitcode not in (None, 0)]
+        if done < workers and (failed or time.monotonic() > deadline):
+            for p in procs:
+                p.terminate()
+            reason = f"exit codes {failed}" if failed else f"no result after {BURST_TIMEOUT} s"
+            raise SystemExit(f"❌ Burst workers failed ({reason}); {done} of {workers} reported.")
+        time.sleep(0.05)
+    for p in procs:
+        p.join()
+    _, body, _ = client.request("GET", f"/api/attendance/{code}", token=instructor_token)
+    committed = {r["student_id"] for r in json.loads(body)["attendance"]}
+    return summarize(merged, wall, errors, 0), (seen == committed) if logged else True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change feed benchmark.")
+    parser.add_argument("--database-url", default="sqlite:///change_feed_bench.db", help="Database to seed (it is reset)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--instructors", type=int, default=10)
+    parser.add_argument("--sessions-per-instructor", type=int, default=10)
+    parser.add_argument("--change-rate", type=float, default=0.01, help="Share of attendance rows changed")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--burst-workers", type=int, default=4, help="Processes checking in at once (0 to skip)")
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    # Each check-in hits the database, as on a freshly started worker
+    overrides = {"SQLALCHEMY_DATABASE_URI": local_database_url(args.database_url), "CHECKIN_CACHE": "off",
+                 "PROFILING_ENABLED": False}
+    app = create_app(overrides)
+    rng = random.Random(7)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        summary = seed(students=args.students, instructors=args.instructors,
+                       sessions_per_instructor=args.sessions_per_instructor, attendance_rate=0.8)
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        admin_token = create_access_token(identity=User.query.filter_by(role="admin").first().user_id)
+        instructor_id = User.query.filter_by(role="instructor").order_by(User.id).first().user_id
+        instructor_token = create_access_token(identity=instructor_id)
+        students = [u for (u,) in db.session.query(User.user_id).filter_by(role="student")]
+        codes = [c for (c,) in db.session.query(Session.session_id)]
+        attended = set(db.session.query(Attendance.student_id, Attendance.session_id))
+        attendance_ids = [i for (i,) in db.session.query(Attendance.id)]
+
+    client = InProcessClient(app)
+    changes = max(2, int(summary["attendance"] * args.change_rate))
+    # Pairs without a check-in: the new check-ins, then the overhead samples
+    available = len(students) * len(codes) - len(attended)
+    samples = min(OVERHEAD_SAMPLES, available - changes // 2)
+    if samples < 2:
+        raise SystemExit(f"❌ Only {available} student/session pairs have no check-in, too few for "
+                         f"{changes // 2} new check-ins and the overhead samples; "
+                         "raise --students or --sessions-per-instructor.")
+    missing = set()
+    while len(missing) < changes // 2 + samples:
+        pair = (rng.choice(students), rng.choice(codes))
+        if pair not in attended:
+            missing.add(pair)
+    missing = sorted(missing)
+    new_pairs, overhead_pairs = missing[:changes // 2], missing[changes // 2:]
+    deleted_ids = rng.sample(attendance_ids, changes - len(new_pairs))
+    with app.app_context():
+        tokens = {sid: create_access_token(identity=sid) for sid, _ in missing}
+
+    # What both clients hold before the changes
+    _, body, _ = client.request("GET", "/api/changes", token=admin_token)
+    admin_since = json.loads(body)["next_since"]
+    _, body, _ = client.request("GET", "/api/changes", token=instructor_token)
+    instructor_since = json.loads(body)["next_since"]
+    admin_snapshot, _ = full_admin(client, admin_token)
+    instructor_snapshot, _ = full_instructor(client, instructor_token)
+
+    check_in(client, new_pairs, tokens)
+    for attendance_id in deleted_ids:
+        status, body, _ = client.request("DELETE", f"/api/attendance/{attendance_id}", token=admin_token)
+        assert status == 200, body[:200]
+    # Write cost of the change log: alternate check-ins with and without its hook
+    logged_ms, unlogged_ms = [], []
+    for i, pair in enumerate(overhead_pairs):
+        if i % 2:
+            event.remove(RoutingSession, "after_flush", _log_flushed_changes)
+            unlogged_ms += check_in(client, [pair], tokens)
+            event.listen(RoutingSession, "after_flush", _log_flushed_changes)
+        else:
+            logged_ms += check_in(client, [pair], tokens)
+    logged_ms.sort()
+    unlogged_ms.sort()
+
+    (admin_full, admin_full_bytes), admin_full_time = timed(lambda: full_admin(client, admin_token), args.repeat)
+    (admin_changes, _, admin_delta_bytes), admin_delta_time = timed(
+        lambda: delta(client, admin_token, admin_since), args.repeat)
+    (instructor_full, instructor_full_bytes), instructor_full_time = timed(
+        lambda: full_instructor(client, instructor_token), args.repeat)
+    (instructor_changes, _, instructor_delta_bytes), instructor_delta_time = timed(
+        lambda: delta(client, instructor_token, instructor_since), args.repeat)
+
+    # Replaying the deltas onto the old snapshots must give the fresh download;
+    # the check-ins made without the hook are the only expected difference
+    for change in admin_changes:
+        if change["entity"] != "attendance":
+            continue
+        if change["op"] == "delete":
+            admin_snapshot.pop(change["key"], None)
+        else:
+            admin_snapshot[change["key"]] = change["data"]
+    unlogged = set(overhead_pairs[1::2])
+    admin_consistent = (
+        set(admin_snapshot) <= set(admin_full)
+        and {(r["student_id"], r["session_id"]) for k, r in admin_full.items() if k not in admin_snapshot} == unlogged
+    )
+    for change in instructor_changes:
+        if change["entity"] != "attendance":
+            continue
+        pair = (change["data"]["student_id"], change["data"]["session_id"])
+        (instructor_snapshot.discard if change["op"] == "delete" else instructor_snapshot.add)(pair)
+    instructor_consistent = instructor_snapshot == instructor_full - unlogged
+
+    # Compaction: drop everything the feed no longer needs, tombstones included
+    with app.app_context():
+        before = ChangeLog.query.count()
+        job = submit("compact_change_log", {"tombstone_days": 0})
+        job_id = job.id
+        compact_start = time.perf_counter()
+        run(job_id)
+        compact_ms = round((time.perf_counter() - compact_start) * 1000, 2)
+        after = ChangeLog.query.count()
+    stale_status, _, _ = client.request("GET", f"/api/changes?since={admin_since}", token=admin_token)
+    # A client that resyncs starts again from the current version
+    _, body, _ = client.request("GET", "/api/changes", token=admin_token)
+    fresh_status, _, _ = client.request("GET", f"/api/changes?since={json.loads(body)['next_since']}",
+                                        token=admin_token)
+    compaction_ok = stale_status == 410 and fresh_status == 200
+
+    # Alternate logged and unlogged bursts, best of two each
+    burst, burst_consistent = {}, True
+    if args.burst_workers:
+        runs = {True: [], False: []}
+        for logged in (True, False, True, False):
+            result, consistent = check_in_burst(overrides, client, admin_token, instructor_token, students,
+                                                args.burst_workers, logged)
+            runs[logged].append(result)
+            burst_consistent = burst_consistent and consistent and not result["errors"]
+        for logged, results in runs.items():
+            best = max(results, key=lambda r: r["throughput_rps"])
+            burst["logged" if logged else "unlogged"] = {
+                "check_ins_per_s": best["throughput_rps"], "p50_ms": best["latency_ms"]["p50"],
+                "p99_ms": best["latency_ms"]["p99"], "errors": sum(r["errors"] for r in results),
+            }
+
+    scenarios = {
+        "admin_full": {**admin_full_time, "bytes": admin_full_bytes, "rows": len(admin_full)},
+        "admin_delta": {**admin_delta_time, "bytes": admin_delta_bytes, "changes": len(admin_changes)},
+        "instructor_full": {**instructor_full_time, "bytes": instructor_full_bytes, "rows": len(instructor_full)},
+        "instructor_delta": {**instructor_delta_time, "bytes": instructor_delta_bytes,
+                             "changes": len(instructor_changes)},
+    }
+    check_ins = {
+        "logged_p50_ms": round(percentile(logged_ms, 50), 2),
+        "unlogged_p50_ms": round(percentile(unlogged_ms, 50), 2),
+    }
+    for name, result in scenarios.items():
+        print(f"{name:<18} p50 {result['p50_ms']:>9} ms  {result['bytes']:>10} bytes")
+    print(f"check-in p50 {check_ins['logged_p50_ms']} ms with the change log, "
+          f"{check_ins['unlogged_p50_ms']} ms without")
+    print(f"compaction: {before} -> {after} entries in {compact_ms} ms")
+    for name, result in burst.items():
+        print(f"burst {name:<9} {result['check_ins_per_s']:>9} check-ins/s  p50 {result['p50_ms']:>8} ms  "
+              f"p99 {result['p99_ms']:>8} ms")
+    ok = admin_consistent and instructor_consistent and compaction_ok and burst_consistent
+    if not ok:
+        print(f"admin consistent: {admin_consistent}, instructor consistent: {instructor_consistent}, "
+              f"compaction: stale {stale_status} / fresh {fresh_status}, burst consistent: {burst_consistent}")
+    print(f"{'✅' if ok else '❌'} deltas reproduce the full download; stale clients get 410 after compaction")
+
+    write_report({
+        "meta": run_metadata(change_rate=args.change_rate, changes=changes, burst_workers=args.burst_workers,
+                             database=args.database_url.split(":", 1)[0], **summary),
+        "scenarios": scenarios,
+        "check_in": check_ins,
+        "check_in_burst": burst,
+        "compaction": {"entries_before": before, "entries_after": after, "ms": compact_ms,
+                       "stale_client_status": stale_status},
+        "consistent": ok,
+    }, args.output)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark the check-in cache with realistic rescans.
+
+Each student scans the projected QR code three times on average (the first
+scan plus rescans a few seconds later), and a small share of scans carry a
+mistyped code. The same scan stream runs with the cache off, with the exact
+seen-set and with the Bloom filter; the report includes SQL statements per
+scan and the memory each seen-set needs per session.
+
+Usage (from the backend directory, after ``python -m bench.seed``):
+    python -m bench.checkin_cache_bench --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from bench.harness import InProcessClient, run_load, run_metadata, write_report
+from bench.seed import local_database_url
+from extensions.checkin_cache import BloomSeenSet, ExactSeenSet
+from extensions.extensions import db
+from models.models import User
+
+
+def scan_stream(students, rescan_rate, invalid_rate, rng):
+    """Ordered (student, code_is_valid) scans: first scans interleaved with rescans."""
+    events = []
+    for student in students:
+        first = rng.uniform(0, 60)
+        events.append((first, student, True))
+        # rescan_rate is total scans per student; the extra ones follow the first
+        repeats = max(rescan_rate - 1, 0)
+        extra = int(repeats) + (rng.random() < repeats % 1)
+        for _ in range(extra):
+            events.append((first + rng.expovariate(1 / 5.0), student, True))
+    for _ in range(int(len(events) * invalid_rate)):
+        events.append((rng.uniform(0, 60), rng.choice(students), False))
+    events.sort()
+    return [(student, valid) for _, student, valid in events]
+
+
+def memory_per_session(sizes):
+    """Bytes per session for each seen-set implementation at several class sizes."""
+    figures = {}
+    for n in sizes:
+        ids = [f"stu_{i:05x}" for i in range(n)]
+        exact = ExactSeenSet()
+        bloom = BloomSeenSet(n * 2)
+        for student_id in ids:
+            exact.add(student_id)
+            bloom.add(student_id)
+        # Measured false-positive rate of the Bloom filter against unseen ids
+        probes = [f"new_{i:06x}" for i in range(20000)]
+        false_positives = sum(p in bloom for p in probes)
+        figures[str(n)] = {
+            "exact_bytes": exact.nbytes(),
+            "bloom_bytes": bloom.nbytes(),
+            "bloom_false_positive_rate": round(false_positives / len(probes), 4),
+        }
+    return figures
+
+
+def run_mode(database_url, mode, students, stream, concurrency):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url, "CHECKIN_CACHE": mode})
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a, **kw: statements.__setitem__(0, statements[0] + 1))
+        instructor = User.query.filter_by(role="instructor").first()
+        instructor_token = create_access_token(identity=instructor.user_id)
+        tokens = {s: create_access_token(identity=s) for s in students}
+
+    client = InProcessClient(app)
+    _, body, _ = client.request("POST", "/api/sessions", json_body={"name": f"Cache Bench {mode}"},
+                                token=instructor_token)
+    code = json.loads(body)["session_id"]
+
+    before = statements[0]
+    result = run_load(client, [
+        {"method": "POST", "path": "/api/attendance", "token": tokens[student],
+         "json_body": {"session_id": code if valid else "00000"}, "ok": (200, 201, 400)}
+        for student, valid in stream
+    ], concurrency)
+    result["sql_statements"] = statements[0] - before
+    result["sql_per_scan"] = round(result["sql_statements"] / len(stream), 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check-in cache benchmark.")
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--students", type=int, default=300, help="Class size")
+    parser.add_argument("--rescan-rate", type=float, default=3.0, help="Average scans per student")
+    parser.add_argument("--invalid-rate", type=float, default=0.05, help="Share of scans with a bad code")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(11)
+    database_url = local_database_url(args.database_url)
+    setup = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with setup.app_context():
+        students = [u.user_id for u in User.query.filter_by(role="student").limit(args.students).all()]
+    stream = scan_stream(students, args.rescan_rate, args.invalid_rate, rng)
+
+    scenarios = {
+        f"cache_{mode}": run_mode(database_url, mode, students, stream, args.concurrency)
+        for mode in ("off", "exact", "bloom")
+    }
+    for name, result in scenarios.items():
+        print(f"{name:<12} {result['throughput_rps']:>8} scans/s  p50 {result['latency_ms']['p50']:>8} ms  "
+              f"{result['sql_per_scan']} SQL/scan")
+
+    write_report({
+        "meta": run_metadata(students=len(students), scans=len(stream), rescan_rate=args.rescan_rate),
+        "memory_per_session": memory_per_session([100, 500, 1000, 5000]),
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Course absentee and attendance-percentage reports.
+
+Seeds an institution, puts ``--students`` of its students on one course with
+``--sessions`` sessions, then times the set-based course endpoints against
+the old workflow: download every check-in for the instructor from the admin
+listing and diff it against the roster in Python.
+
+Usage (from the backend directory):
+    python -m bench.course_report_bench --database-url sqlite:///course_bench.db
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, text
+
+from app import create_app
+from bench.harness import InProcessClient, percentile, run_metadata, write_report
+from bench.seed import local_database_url, seed
+from extensions.extensions import db
+from models.models import Course, Enrollment, Session, User
+
+
+def build_course(students, rng):
+    """Course for the first instructor over all their sessions, with a random roster."""
+    instructor = User.query.filter_by(role="instructor").order_by(User.id).first()
+    course = Course(code="BENCH101", name="Benchmark Course", instructor_id=instructor.user_id)
+    db.session.add(course)
+    db.session.flush()
+    Session.query.filter_by(instructor_id=instructor.user_id).update({"course_id": course.id})
+    pool = [u.user_id for u in User.query.filter_by(role="student")]
+    db.session.execute(db.insert(Enrollment), [
+        {"course_id": course.id, "student_id": sid, "institution_id": "default"}
+        for sid in rng.sample(pool, students)
+    ])
+    db.session.commit()
+    return course.id, instructor.user_id
+
+
+def python_diff(client, admin_token, instructor_token, instructor_id, course_id):
+    """The old way: every check-in for the instructor, diffed against the roster."""
+    _, body, _ = client.request("GET", f"/api/attendance?instructor_id={instructor_id}", token=admin_token)
+    records = json.loads(body)
+    _, roster, _ = client.request("GET", f"/api/courses/{course_id}/students", token=instructor_token)
+    _, sessions, _ = client.request("GET", "/api/sessions", token=instructor_token)
+    roster = [s["student_id"] for s in json.loads(roster)]
+    codes = [s["session_id"] for s in json.loads(sessions)]
+    attended = {(r["student_id"], r["session_id"]) for r in records}
+    absentees = [(code, sid) for code in codes for sid in roster if (sid, code) not in attended]
+    percentages = {sid: 100.0 * sum((sid, c) in attended for c in codes) / len(codes) for sid in roster}
+    return len(body), len(absentees), percentages
+
+
+def time_calls(fn, repeat, statements):
+    latencies, sql, size = [], [], 0
+    for _ in range(repeat):
+        before = statements[0]
+        t0 = time.perf_counter()
+        size = fn()
+        latencies.append(time.perf_counter() - t0)
+        sql.append(statements[0] - before)
+    ms = sorted(x * 1000 for x in latencies)
+    return {"p50_ms": round(percentile(ms, 50), 2), "max_ms": round(ms[-1], 2),
+            "sql_statements": max(sql), "response_bytes": size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Course report benchmark.")
+    parser.add_argument("--database-url", default="sqlite:///course_bench.db", help="Database to seed (it is reset)")
+    parser.add_argument("--students", type=int, default=500, help="Students on the course")
+    parser.add_argument("--sessions", type=int, default=40, help="Sessions in the course")
+    parser.add_argument("--institution-students", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": local_database_url(args.database_url)})
+    statements = [0]
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(students=args.institution_students, instructors=4, sessions_per_instructor=args.sessions,
+             attendance_rate=0.8)
+        course_id, instructor_id = build_course(args.students, random.Random(5))
+        # Planner statistics, as autovacuum keeps on PostgreSQL; without them
+        # SQLite probes attendance by student rather than by session and student
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        admin_token = create_access_token(identity=User.query.filter_by(role="admin").first().user_id)
+        instructor_token = create_access_token(identity=instructor_id)
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a, **kw: statements.__setitem__(0, statements[0] + 1))
+
+    client = InProcessClient(app)
+
+    def endpoint(path):
+        def call():
+            status, body, _ = client.request("GET", path, token=instructor_token)
+            assert status == 200, (path, status, body[:200])
+            return len(body)
+        return call
+
+    base = f"/api/courses/{course_id}"
+    scenarios = {
+        "summary": time_calls(endpoint(f"{base}/attendance-summary"), args.repeat, statements),
+        "absentees": time_calls(endpoint(f"{base}/absentees"), args.repeat, statements),
+        "absentees_one_session": time_calls(endpoint(f"{base}/absentees?limit=1000&session_id="
+                                                     f"{_first_session(app, course_id)}"), args.repeat, statements),
+        "matrix_csv": time_calls(endpoint(f"{base}/matrix"), args.repeat, statements),
+        "matrix_json": time_calls(endpoint(f"{base}/matrix?format=json"), args.repeat, statements),
+        "python_diff_baseline": time_calls(
+            lambda: python_diff(client, admin_token, instructor_token, instructor_id, course_id)[0],
+            args.repeat, statements),
+    }
+
+    # The set-based answers must match the Python diff
+    _, absent_count, percentages = python_diff(client, admin_token, instructor_token, instructor_id, course_id)
+    _, body, _ = client.request("GET", f"{base}/absentees", token=instructor_token)
+    _, summary, _ = client.request("GET", f"{base}/attendance-summary", token=instructor_token)
+    consistent = len(json.loads(body)) == absent_count and all(
+        abs(s["percentage"] - round(percentages[s["student_id"]], 1)) < 0.05 for s in json.loads(summary)["students"]
+    )
+
+    for name, result in scenarios.items():
+        print(f"{name:<22} p50 {result['p50_ms']:>9} ms  {result['sql_statements']:>3} SQL  "
+              f"{result['response_bytes']:>9} bytes")
+    print(f"{'✅' if consistent else '❌'} endpoints agree with the Python diff ({absent_count} absences)")
+
+    write_report({
+        "meta": run_metadata(students=args.students, sessions=args.sessions,
+                             institution_students=args.institution_students),
+        "absences": absent_count,
+        "consistent_with_python_diff": consistent,
+        "scenarios": scenarios,
+    }, args.output)
+
+
+def _first_session(app, course_id):
+    with app.app_context():
+        return Session.query.filter_by(course_id=course_id).order_by(Session.created_at).first().session_id
+
+
+if __name__ == "__main__":
+    main()
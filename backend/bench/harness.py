@@ -0,0 +1,159 @@
+"""Shared helpers for the benchmark scripts: clients, load driver and reports."""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InProcessClient:
+    """Drives the app through Flask's test client (one per thread)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def request(self, method, path, json_body=None, token=None, headers=None):
+        all_headers = dict(headers or {})
+        if token:
+            all_headers["Authorization"] = f"Bearer {token}"
+        response = self._client().open(path, method=method, json=json_body, headers=all_headers)
+        return response.status_code, response.get_data(), dict(response.headers)
+
+
+class HttpClient:
+    """Drives a running server over HTTP (e.g. gunicorn on localhost)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, json_body=None, token=None, headers=None):
+        all_headers = dict(headers or {})
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            all_headers["Content-Type"] = "application/json"
+        if token:
+            all_headers["Authorization"] = f"Bearer {token}"
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=all_headers)
+        try:
+            with urllib.request.urlopen(req) as resp:
+                return resp.status, resp.read(), dict(resp.headers)
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), dict(e.headers)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, wall_time, errors, total_bytes):
+    """Turn raw per-request timings (seconds) into a report entry."""
+    ms = sorted(x * 1000.0 for x in latencies)
+    count = len(ms)
+    return {
+        "requests": count,
+        "errors": errors,
+        "wall_s": round(wall_time, 4),
+        "throughput_rps": round(count / wall_time, 2) if wall_time else 0.0,
+        "bytes": total_bytes,
+        "latency_ms": {
+            "min": round(ms[0], 3) if ms else 0.0,
+            "mean": round(sum(ms) / count, 3) if ms else 0.0,
+            "p50": round(percentile(ms, 50), 3),
+            "p90": round(percentile(ms, 90), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+
+
+def run_load(client, calls, concurrency, ok_statuses=(200, 201)):
+    """Execute ``calls`` (dicts of request kwargs) across ``concurrency`` threads.
+
+    Each call is ``{"method", "path", "json_body"?, "token"?, "headers"?, "ok"?}``
+    where ``ok`` overrides the statuses counted as success.
+    Returns a summary from :func:`summarize`.
+    """
+    latencies = []
+    errors = 0
+    total_bytes = 0
+    lock = threading.Lock()
+
+    def run_one(call):
+        nonlocal errors, total_bytes
+        ok = call.get("ok", ok_statuses)
+        request_kwargs = {k: v for k, v in call.items() if k != "ok"}
+        start = time.perf_counter()
+        status, body, _ = client.request(**request_kwargs)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            total_bytes += len(body)
+            if status not in ok:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_one, calls))
+    wall_time = time.perf_counter() - wall_start
+    return summarize(latencies, wall_time, errors, total_bytes)
+
+
+def run_metadata(**extra):
+    """Environment details recorded alongside results so runs can be compared."""
+    try:
+        revision = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def write_report(report, path):
+    """Write a JSON report; ``-`` prints to stdout."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path == "-":
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"📄 Report written to {path}")
+
+
+def compare_reports(old, new):
+    """Print per-scenario deltas for throughput and p50/p95 latency."""
+    print(f"{'scenario':<28}{'rps old':>10}{'rps new':>10}{'p50 old':>10}{'p50 new':>10}{'p95 old':>10}{'p95 new':>10}")
+    for name, entry in new["scenarios"].items():
+        prev = old.get("scenarios", {}).get(name)
+        if not prev:
+            print(f"{name:<28}{'-':>10}{entry['throughput_rps']:>10}")
+            continue
+        print(
+            f"{name:<28}{prev['throughput_rps']:>10}{entry['throughput_rps']:>10}"
+            f"{prev['latency_ms']['p50']:>10}{entry['latency_ms']['p50']:>10}"
+            f"{prev['latency_ms']['p95']:>10}{entry['latency_ms']['p95']:>10}"
+        )
@@ -0,0 +1,221 @@
+"""Background job runner: request latency, concurrency limits and crash recovery.
+
+Scenarios (SQLite file, workers are separate processes):
+
+  delete_latency     DELETE /api/users/<id> inline vs ``?background=1`` for
+                     instructors with many sessions, plus the worker's time
+  concurrency_limit  four jobs of a kind limited to 1 across two workers;
+                     never more than one may be running at once
+  retry              a job that fails on its first attempt succeeds on the second
+  crash_recovery     a worker is SIGKILLed mid-job; another worker re-queues the
+                     job once its heartbeat goes stale and finishes it
+
+tests/test_jobs.py covers claiming, retries and recovery in one process; the
+last three scenarios check them across real worker processes: any failure is
+reported and the script exits non-zero.
+
+Usage (from the backend directory):
+    python -m bench.jobs_bench --database-url sqlite:////tmp/jobs_bench.db
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from bench.harness import InProcessClient, run_metadata, write_report
+from bench.seed import local_database_url, seed
+from app import create_app
+from extensions.extensions import db
+from jobs.runner import Worker, job_handler, submit
+from models.models import Job, JobStatus, User
+
+# Short timings so a dead worker is noticed within a couple of seconds
+JOB_SETTINGS = {
+    "JOB_HEARTBEAT_SECONDS": 0.3,
+    "JOB_STALE_SECONDS": 1.5,
+    "JOB_CONCURRENCY": {"bench_sleep": 1},
+    "CHECKIN_CACHE": "off",
+}
+
+
+@job_handler("bench_sleep")
+def bench_sleep(ctx):
+    """Sleep in steps, reporting progress; used to hold a job mid-run."""
+    steps = ctx.payload.get("steps", 5)
+    for step in range(steps):
+        time.sleep(ctx.payload.get("seconds", 1.0) / steps)
+        ctx.progress(step + 1, steps)
+    ctx.result = {"attempt": ctx.attempt}
+
+
+@job_handler("bench_flaky")
+def bench_flaky(ctx):
+    if ctx.attempt == 1:
+        raise RuntimeError("Simulated failure on the first attempt")
+    ctx.result = {"attempt": ctx.attempt}
+
+
+def _work(overrides, worker_id, threads):
+    app = create_app(overrides)
+    Worker(app, threads=threads, poll_interval=0.1, worker_id=worker_id).start()
+
+
+def start_worker(overrides, worker_id, threads=1):
+    process = multiprocessing.get_context("spawn").Process(target=_work, args=(overrides, worker_id, threads))
+    process.start()
+    return process
+
+
+def wait_for(app, job_ids, predicate, timeout=60.0, on_poll=None):
+    """Poll until ``predicate(jobs)`` holds; returns the final jobs."""
+    deadline = time.monotonic() + timeout
+    while True:
+        with app.app_context():
+            jobs = Job.query.filter(Job.id.in_(job_ids)).order_by(Job.id).all()
+            if on_poll:
+                on_poll(jobs)
+            if predicate(jobs) or time.monotonic() > deadline:
+                return [(j.id, j.status, j.attempts, j.progress, j.result, j.error) for j in jobs]
+        time.sleep(0.05)
+
+
+def submit_jobs(app, kind, payloads):
+    with app.app_context():
+        return [submit(kind, payload).id for payload in payloads]
+
+
+def finished(jobs):
+    return all(j.status in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value) for j in jobs)
+
+
+def delete_latency(app, overrides):
+    """Inline cascade vs submit-and-poll for the same kind of instructor."""
+    with app.app_context():
+        admin = User.query.filter_by(role="admin").first()
+        token = create_access_token(identity=admin.user_id)
+        inline_id, background_id = [u.user_id for u in User.query.filter_by(role="instructor").limit(2)]
+    client = InProcessClient(app)
+
+    t0 = time.perf_counter()
+    status, _, _ = client.request("DELETE", f"/api/users/{inline_id}", token=token)
+    inline_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    status_bg, body, _ = client.request("DELETE", f"/api/users/{background_id}?background=1", token=token)
+    accepted_ms = (time.perf_counter() - t0) * 1000
+    job_id = json.loads(body)["job_id"]
+
+    worker = start_worker(overrides, "bench-delete")
+    t0 = time.perf_counter()
+    [(_, job_status, _, _, result, _)] = wait_for(app, [job_id], finished)
+    worker_s = time.perf_counter() - t0
+    worker.terminate()
+    worker.join()
+    return {
+        "inline_status": status,
+        "inline_ms": round(inline_ms, 2),
+        "background_status": status_bg,
+        "background_response_ms": round(accepted_ms, 2),
+        "background_job_status": job_status,
+        "background_worker_seconds_incl_startup": round(worker_s, 2),
+        "background_result": result,
+    }
+
+
+def concurrency_limit(app, overrides):
+    job_ids = submit_jobs(app, "bench_sleep", [{"seconds": 0.6}] * 4)
+    workers = [start_worker(overrides, f"bench-limit-{i}", threads=2) for i in range(2)]
+    peak = [0]
+
+    def track(jobs):
+        peak[0] = max(peak[0], sum(j.status == JobStatus.RUNNING.value for j in jobs))
+
+    jobs = wait_for(app, job_ids, finished, on_poll=track)
+    for w in workers:
+        w.terminate()
+        w.join()
+    return {
+        "passed": peak[0] == 1 and all(status == JobStatus.SUCCEEDED.value for _, status, *_ in jobs),
+        "limit": 1,
+        "peak_running": peak[0],
+        "statuses": [status for _, status, *_ in jobs],
+    }
+
+
+def retry(app, overrides):
+    [job_id] = submit_jobs(app, "bench_flaky", [{}])
+    worker = start_worker(overrides, "bench-retry")
+    [(_, status, attempts, _, result, _)] = wait_for(app, [job_id], finished)
+    worker.terminate()
+    worker.join()
+    return {"passed": status == JobStatus.SUCCEEDED.value and attempts == 2,
+            "status": status, "attempts": attempts, "result": result}
+
+
+def crash_recovery(app, overrides):
+    [job_id] = submit_jobs(app, "bench_sleep", [{"seconds": 3.0, "steps": 10}])
+    doomed = start_worker(overrides, "bench-doomed")
+    [(_, _, _, progress_at_kill, _, _)] = wait_for(
+        app, [job_id], lambda jobs: jobs[0].status == JobStatus.RUNNING.value and jobs[0].progress >= 20)
+    doomed.kill()  # SIGKILL: no cleanup, the job row stays 'running'
+    doomed.join()
+    killed_at = time.perf_counter()
+
+    rescuer = start_worker(overrides, "bench-rescuer")
+    [(_, status, attempts, _, result, error)] = wait_for(app, [job_id], finished)
+    recovered_s = time.perf_counter() - killed_at
+    rescuer.terminate()
+    rescuer.join()
+    return {
+        "passed": status == JobStatus.SUCCEEDED.value and attempts == 2 and result == {"attempt": 2},
+        "status": status,
+        "attempts": attempts,
+        "progress_at_kill": progress_at_kill,
+        "seconds_from_kill_to_done": round(recovered_s, 2),
+        "last_error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Background job runner benchmark and checks.")
+    parser.add_argument("--database-url", default="sqlite:///jobs_bench.db",
+                        help="Database to seed and use (it is reset)")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--sessions-per-instructor", type=int, default=40)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    overrides = dict(JOB_SETTINGS, SQLALCHEMY_DATABASE_URI=local_database_url(args.database_url))
+    app = create_app(overrides)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(students=args.students, instructors=4, sessions_per_instructor=args.sessions_per_instructor,
+             attendance_rate=0.8)
+
+    scenarios = {
+        "delete_latency": delete_latency(app, overrides),
+        "concurrency_limit": concurrency_limit(app, overrides),
+        "retry": retry(app, overrides),
+        "crash_recovery": crash_recovery(app, overrides),
+    }
+    latency = scenarios["delete_latency"]
+    print(f"delete_user inline {latency['inline_ms']} ms vs background accept "
+          f"{latency['background_response_ms']} ms")
+    failures = [name for name, result in scenarios.items() if result.get("passed") is False]
+    for name, result in scenarios.items():
+        if "passed" in result:
+            print(f"{'✅' if result['passed'] else '❌'} {name}")
+
+    write_report({"meta": run_metadata(students=args.students), "scenarios": scenarios}, args.output)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark ``GET /api/me/attendance`` against filtering the admin dump.
+
+Before the endpoint existed the only way to get one student's history was to
+download ``GET /api/attendance`` and filter it client-side. This script times
+both paths for the same students and also reports the conditional-GET case.
+
+Usage (from the backend directory, after ``python -m bench.seed``):
+    python -m bench.me_attendance_bench --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import random
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from bench.harness import InProcessClient, run_load, run_metadata, summarize, write_report
+from bench.seed import build_app
+from extensions.extensions import db
+from models.models import User
+
+
+def filtered_admin_dump(client, admin_token, student_ids):
+    """Time downloading the full dump and picking out one student's rows."""
+    latencies = []
+    total_bytes = 0
+    errors = 0
+    wall_start = time.perf_counter()
+    for student_id in student_ids:
+        start = time.perf_counter()
+        status, body, _ = client.request("GET", "/api/attendance", token=admin_token)
+        [r for r in json.loads(body) if r["student_id"] == student_id]
+        latencies.append(time.perf_counter() - start)
+        total_bytes += len(body)
+        errors += status != 200
+    return summarize(latencies, time.perf_counter() - wall_start, errors, total_bytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--dump-requests", type=int, default=5, help="Full dumps are slow; run fewer")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(7)
+    app = build_app(args.database_url)
+    with app.app_context():
+        students = [u.user_id for u in User.query.filter_by(role="student").limit(500).all()]
+        admin = User.query.filter_by(role="admin").first()
+        student_tokens = {s: create_access_token(identity=s) for s in students}
+        admin_token = create_access_token(identity=admin.user_id)
+        plan = None
+        if db.engine.dialect.name == "sqlite":
+            plan = [row[-1] for row in db.session.execute(db.text(
+                "EXPLAIN QUERY PLAN SELECT id, session_id, timestamp FROM attendance "
+                "WHERE student_id = :s ORDER BY timestamp DESC, id DESC LIMIT 51"
+            ), {"s": students[0]})]
+
+    client = InProcessClient(app)
+    picks = [rng.choice(students) for _ in range(args.requests)]
+
+    scenarios = {
+        "me_attendance": run_load(client, [
+            {"method": "GET", "path": "/api/me/attendance", "token": student_tokens[s]} for s in picks
+        ], args.concurrency),
+    }
+
+    # Conditional GET with the ETag the client already holds
+    etags = {}
+    for s in set(picks):
+        _, _, headers = client.request("GET", "/api/me/attendance", token=student_tokens[s])
+        etags[s] = headers.get("ETag")
+    scenarios["me_attendance_not_modified"] = run_load(client, [
+        {"method": "GET", "path": "/api/me/attendance", "token": student_tokens[s],
+         "headers": {"If-None-Match": etags[s]}, "ok": (304,)}
+        for s in picks
+    ], args.concurrency)
+
+    scenarios["admin_dump_filtered"] = filtered_admin_dump(
+        client, admin_token, picks[:args.dump_requests]
+    )
+
+    write_report({
+        "meta": run_metadata(database=app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0], query_plan=plan),
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Overhead of the request profiling hooks.
+
+The same instructor dashboard request (``GET /api/sessions``) runs against
+three apps:
+
+  disabled  PROFILING_ENABLED off: no hooks installed
+  idle      hooks installed, no header and no sampling (the production default)
+  sampled   every request profiled (PROFILE_SAMPLE_RATE=1), for scale
+
+Rounds alternate between the apps so drift affects them equally; the report
+gives each app's best-round mean and p50, and the overhead relative to
+``disabled``. End-to-end differences of a few percent are within run-to-run
+noise, so the idle per-request hook cost is also timed directly.
+
+Usage (from the backend directory, after ``python -m bench.seed``):
+    python -m bench.profiling_bench --database-url sqlite:///bench.db
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from bench.harness import InProcessClient, run_load, run_metadata, write_report
+from bench.seed import local_database_url
+from extensions import profiling
+from models.models import User
+
+MODES = {
+    "disabled": {"PROFILING_ENABLED": False},
+    "idle": {"PROFILING_ENABLED": True, "PROFILE_SAMPLE_RATE": 0.0},
+    "sampled": {"PROFILING_ENABLED": True, "PROFILE_SAMPLE_RATE": 1.0},
+}
+
+
+def idle_hook_cost_us(app, token, iterations=20000):
+    """Microseconds the idle request hooks add to one request."""
+    headers = {"Authorization": f"Bearer {token}"}
+    with app.test_request_context("/api/sessions", headers=headers):
+        response = app.response_class()
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            profiling._start_profile()
+            profiling._finish_profile(response)
+            profiling._abandon_profile(None)
+        return round((time.perf_counter() - t0) / iterations * 1e6, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profiling hook overhead benchmark.")
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    base = {"SQLALCHEMY_DATABASE_URI": local_database_url(args.database_url)}
+    apps = {name: create_app(dict(base, **overrides)) for name, overrides in MODES.items()}
+    with apps["disabled"].app_context():
+        instructor = User.query.filter_by(role="instructor").first()
+        token = create_access_token(identity=instructor.user_id)
+    clients = {name: InProcessClient(app) for name, app in apps.items()}
+    calls = [{"method": "GET", "path": "/api/sessions", "token": token}] * args.requests
+
+    rounds = {name: [] for name in MODES}
+    for _ in range(args.rounds):
+        for name, client in clients.items():
+            rounds[name].append(run_load(client, calls, 1))
+
+    scenarios = {}
+    for name, results in rounds.items():
+        best = min(results, key=lambda r: r["latency_ms"]["mean"])
+        scenarios[name] = {
+            "mean_ms": best["latency_ms"]["mean"],
+            "p50_ms": best["latency_ms"]["p50"],
+            "p99_ms": best["latency_ms"]["p99"],
+            "errors": sum(r["errors"] for r in results),
+        }
+    baseline = scenarios["disabled"]["mean_ms"]
+    for name, result in scenarios.items():
+        result["overhead_pct"] = round((result["mean_ms"] / baseline - 1) * 100, 2)
+        print(f"{name:<9} mean {result['mean_ms']:>8} ms  p50 {result['p50_ms']:>8} ms  "
+              f"overhead {result['overhead_pct']:+}%")
+
+    hook_cost = idle_hook_cost_us(apps["idle"], token)
+    print(f"idle hooks: {hook_cost} us per request")
+
+    write_report({
+        "meta": run_metadata(requests_per_round=args.requests, rounds=args.rounds),
+        "idle_hook_cost_us": hook_cost,
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
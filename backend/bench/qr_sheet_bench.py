@@ -0,0 +1,93 @@
+"""Bulk QR sheet rendering: serial versus the process pool.
+
+Renders ``--codes`` captioned QR cards once in-process and once with the pool
+at each ``--workers`` setting (pool start-up is timed separately, as web
+workers keep the pool warm), then times the full ``POST /api/qr/sheet``
+request for ZIP and PDF output.
+
+Usage (from the backend directory):
+    python -m bench.qr_sheet_bench --codes 500 --workers 2 4
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from bench.harness import InProcessClient, run_metadata, write_report
+from bench.seed import local_database_url, seed
+from extensions import qr_sheets
+from extensions.extensions import db
+from models.models import User
+
+
+def time_render(items, workers):
+    """Seconds to render ``items``; the pool is warmed first so start-up is excluded."""
+    startup = 0.0
+    if workers > 1:
+        t0 = time.perf_counter()
+        qr_sheets.render_cards(items[:qr_sheets.PARALLEL_THRESHOLD * workers], workers)
+        startup = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cards = qr_sheets.render_cards(items, workers)
+    return time.perf_counter() - t0, startup, sum(len(c) for c in cards)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk QR rendering benchmark.")
+    parser.add_argument("--database-url", default="sqlite:///qr_bench.db", help="Database to seed (it is reset)")
+    parser.add_argument("--codes", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, os.cpu_count() or 1])
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    if (os.cpu_count() or 1) < max(args.workers):
+        print(f"⚠️ {os.cpu_count()} CPU(s): pools larger than that cannot run faster than serial.")
+
+    items = [(qr_sheets.attendance_url(f"{10000 + i}"), f"Operating Systems - Week {i}") for i in range(args.codes)]
+    serial_s, _, total_bytes = time_render(items, 1)
+    render = {"serial": {"seconds": round(serial_s, 3), "codes_per_second": round(args.codes / serial_s, 1)}}
+    for workers in sorted(set(args.workers)):
+        if workers <= 1:
+            continue
+        seconds, startup, _ = time_render(items, workers)
+        render[f"pool_{workers}"] = {
+            "seconds": round(seconds, 3),
+            "codes_per_second": round(args.codes / seconds, 1),
+            "speedup": round(serial_s / seconds, 2),
+            "pool_startup_seconds": round(startup, 3),
+        }
+
+    # End to end through the endpoint, for one instructor with --codes sessions
+    app = create_app({"SQLALCHEMY_DATABASE_URI": local_database_url(args.database_url), "QR_SHEET_MAX_SESSIONS": args.codes})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(students=10, instructors=1, sessions_per_instructor=args.codes, attendance_rate=0.0)
+        token = create_access_token(identity=User.query.filter_by(role="instructor").first().user_id)
+    client = InProcessClient(app)
+    endpoint = {}
+    for fmt in ("zip", "pdf"):
+        t0 = time.perf_counter()
+        status, body, _ = client.request("POST", "/api/qr/sheet", json_body={"format": fmt}, token=token)
+        endpoint[fmt] = {"status": status, "seconds": round(time.perf_counter() - t0, 3), "bytes": len(body)}
+
+    for name, result in render.items():
+        print(f"{name:<8} {result['seconds']:>7} s  {result['codes_per_second']:>7} codes/s"
+              f"  x{result.get('speedup', 1.0)}")
+    for fmt, result in endpoint.items():
+        print(f"POST /api/qr/sheet ({fmt}) {result['seconds']} s, {result['bytes']} bytes")
+
+    write_report({
+        "meta": run_metadata(codes=args.codes, card_bytes=total_bytes),
+        "render": render,
+        "endpoint": endpoint,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Exercise read-replica routing with two local databases.
+
+Seeds a primary, copies it to a replica, then:
+  1. checks read-your-writes: an instructor reading from a fresh client (as
+     on another worker) sees a session they just created by sending back the
+     write's ``X-Last-Write`` marker, even though the replica copy is stale,
+     and reads move to the replica once the sticky window has passed;
+  2. times a check-in burst while admin listings run concurrently, with and
+     without the replica configured.
+
+Usage (from the backend directory):
+    python -m bench.replica_bench --primary sqlite:///primary.db --replica sqlite:///replica.db
+For PostgreSQL, point ``--replica`` at a database kept in sync by streaming
+replication (or refreshed with pg_dump/pg_restore) and pass ``--no-copy``.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from bench.harness import InProcessClient, run_load, run_metadata, write_report
+from bench.seed import local_database_url, seed
+from app import create_app
+from extensions.extensions import db
+from extensions.routing import REPLICA_BIND, WRITE_MARKER_HEADER
+from models.models import User, Session
+
+
+def copy_sqlite(primary_url, replica_url):
+    """Snapshot the primary SQLite file into the replica file."""
+    src = sqlite3.connect(urlparse(primary_url).path)
+    dst = sqlite3.connect(urlparse(replica_url).path)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def count_queries(app):
+    """Attach counters recording how many statements hit each engine."""
+    counts = Counter()
+    with app.app_context():
+        for key, engine in db.engines.items():
+            name = key or "primary"
+            event.listen(engine, "before_cursor_execute",
+                         lambda *a, _name=name, **kw: counts.update([_name]))
+    return counts
+
+
+def check_read_your_writes(app, counts):
+    """Create a session, then read it back as if from another worker.
+
+    The reader is a fresh client without cookies, so only the ``X-Last-Write``
+    marker from the write's response can send it to the primary.
+    """
+    writer = app.test_client()
+    reader = app.test_client(use_cookies=False)
+    with app.app_context():
+        instructor = User.query.filter_by(role="instructor").first()
+        token = create_access_token(identity=instructor.user_id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = writer.post("/api/sessions", json={"name": "Replica Check"}, headers=headers)
+    created = response.get_json()
+    marker = {WRITE_MARKER_HEADER: response.headers[WRITE_MARKER_HEADER]}
+
+    def read(extra):
+        before = dict(counts)
+        sessions = reader.get("/api/sessions", headers={**headers, **extra}).get_json()
+        return sessions, {k: counts[k] - before.get(k, 0) for k in counts}
+
+    immediate, immediate_hits = read(marker)
+    unmarked, unmarked_hits = read({})
+    # Marker timestamps have one-second resolution
+    time.sleep(app.config["REPLICA_STICKY_SECONDS"] + 1.1)
+    later, later_hits = read(marker)
+
+    code = created["session_id"]
+    return {
+        "sees_own_write_immediately": any(s["session_id"] == code for s in immediate),
+        "immediate_queries": immediate_hits,
+        "without_marker_queries": unmarked_hits,
+        "after_window_sees_write": any(s["session_id"] == code for s in later),
+        "after_window_queries": later_hits,
+    }
+
+
+def contended_burst(app, students, admin_token, concurrency, admin_loops):
+    """Time a check-in burst while admin listings hammer the database."""
+    client = InProcessClient(app)
+    with app.app_context():
+        instructor = User.query.filter_by(role="instructor").first()
+        session = Session(name="Contended Burst", instructor_id=instructor.user_id)
+        db.session.add(session)
+        db.session.commit()
+        code = session.session_id
+        tokens = [create_access_token(identity=s) for s in students]
+
+    stop = threading.Event()
+
+    def admin_reader():
+        loops = 0
+        while not stop.is_set() and loops < admin_loops:
+            for path in ("/api/users", "/api/attendance", "/api/sessions/all"):
+                client.request("GET", path, token=admin_token)
+            loops += 1
+
+    readers = [threading.Thread(target=admin_reader) for _ in range(2)]
+    for r in readers:
+        r.start()
+    result = run_load(client, [
+        {"method": "POST", "path": "/api/attendance", "token": t, "json_body": {"session_id": code}}
+        for t in tokens
+    ], concurrency)
+    stop.set()
+    for r in readers:
+        r.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-replica routing check and benchmark.")
+    parser.add_argument("--primary", default="sqlite:///replica_primary.db")
+    parser.add_argument("--replica", default="sqlite:///replica_replica.db")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--admin-loops", type=int, default=3)
+    parser.add_argument("--no-copy", action="store_true", help="Replica is kept in sync externally")
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+    local_database_url(args.primary)
+    local_database_url(args.replica)
+
+    primary_only = create_app({"SQLALCHEMY_DATABASE_URI": args.primary})
+    with primary_only.app_context():
+        seed(students=args.students, reset=True)
+        students = [u.user_id for u in User.query.filter_by(role="student").all()]
+        admin_token = create_access_token(identity=User.query.filter_by(role="admin").first().user_id)
+    if not args.no_copy:
+        copy_sqlite(args.primary, args.replica)
+
+    routed = create_app({
+        "SQLALCHEMY_DATABASE_URI": args.primary,
+        "SQLALCHEMY_BINDS": {REPLICA_BIND: args.replica},
+        "REPLICA_STICKY_SECONDS": 1,
+    })
+    counts = count_queries(routed)
+    consistency = check_read_your_writes(routed, counts)
+
+    rng = random.Random(3)
+    burst = rng.sample(students, min(args.burst, len(students)))
+    half = len(burst) // 2
+    scenarios = {
+        "burst_primary_only": contended_burst(primary_only, burst[:half], admin_token, args.concurrency, args.admin_loops),
+        "burst_with_replica": contended_burst(routed, burst[half:], admin_token, args.concurrency, args.admin_loops),
+    }
+
+    write_report({
+        "meta": run_metadata(primary=args.primary, replica=args.replica, queries_per_engine=dict(counts)),
+        "read_your_writes": consistency,
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Synthetic data generator for local benchmarking.
+
+Creates realistic users, sessions and attendance through ``create_app`` so the
+same models and database settings as production are used. Works against a
+SQLite file or a local PostgreSQL database.
+
+Usage (from the backend directory):
+    python -m bench.seed --database-url sqlite:///bench.db --students 2000
+"""
+import argparse
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.engine import make_url
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions.extensions import db
+from extensions.tenancy import DEFAULT_INSTITUTION
+from models.models import User, Session, Attendance, Institution
+
+# Hosts benchmarks may write to (None: a local Unix socket)
+LOCAL_HOSTS = {None, "localhost", "127.0.0.1", "::1"}
+
+# Every seeded account shares this password so benchmarks can log in
+SEED_PASSWORD = "benchpass123"
+
+FIRST_NAMES = [
+    "amina", "brian", "chloe", "daniel", "esther", "faith", "george", "hassan",
+    "irene", "james", "kevin", "lucy", "mercy", "nelson", "olivia", "peter",
+    "queen", "ruth", "samuel", "tabitha", "umar", "violet", "wanjiru", "yusuf",
+]
+LAST_NAMES = [
+    "achieng", "baraka", "chebet", "diallo", "evans", "fofana", "gitau",
+    "hamisi", "ibrahim", "juma", "kamau", "langat", "mwangi", "njoroge",
+    "otieno", "wekesa",
+]
+COURSES = [
+    "Calculus", "Data Structures", "Operating Systems", "Databases",
+    "Computer Networks", "Linear Algebra", "Software Engineering",
+    "Discrete Maths", "Statistics", "Compilers",
+]
+
+
+def local_database_url(url):
+    """Return ``url`` if it is SQLite or a database on this machine.
+
+    Benchmarks drop, seed and write to their database, so they never fall
+    back to the app's DATABASE_URL (which may be production).
+    """
+    if not url:
+        raise SystemExit("❌ Pass --database-url (SQLite or a local PostgreSQL database).")
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" and parsed.host not in LOCAL_HOSTS:
+        raise SystemExit(f"❌ Refusing to use {parsed.host}: benchmarks only run against SQLite or localhost.")
+    return url
+
+
+def build_app(database_url):
+    """Create the Flask app bound to a local benchmark database."""
+    return create_app({"SQLALCHEMY_DATABASE_URI": local_database_url(database_url)})
+
+
+def _make_users(role, prefix, count, password_hash, rng, institution):
+    users = []
+    # Keep ids unique when several institutions share one database
+    if institution != DEFAULT_INSTITUTION:
+        prefix = f"{prefix}_{institution}"
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        username = f"{first}.{last}.{prefix}{i}"
+        users.append(User(
+            username=username,
+            email=f"{username}@bench.example.edu",
+            password=password_hash,
+            role=role,
+            user_id=f"{prefix}_{i:05x}",
+            institution_id=institution,
+        ))
+    return users
+
+
+def seed(students=1000, instructors=20, sessions_per_instructor=10,
+         attendance_rate=0.8, admins=1, reset=False, rng_seed=42, batch_size=5000,
+         institution=DEFAULT_INSTITUTION):
+    """Populate the current app's database and return a summary dict.
+
+    Must be called inside an application context.
+    """
+    rng = random.Random(rng_seed)
+
+    if reset:
+        db.drop_all()
+    db.create_all()
+    if not Institution.query.filter_by(code=institution).first():
+        db.session.add(Institution(code=institution, name=institution.title()))
+        db.session.commit()
+
+    # Hashing is deliberately slow, so hash once and reuse it for every account
+    password_hash = generate_password_hash(SEED_PASSWORD)
+
+    student_users = _make_users("student", "stu", students, password_hash, rng, institution)
+    instructor_users = _make_users("instructor", "ins", instructors, password_hash, rng, institution)
+    admin_users = _make_users("admin", "adm", admins, password_hash, rng, institution)
+    db.session.add_all(admin_users + instructor_users + student_users)
+    db.session.commit()
+
+    # Draw unique 5-digit codes up front instead of probing the DB per session
+    total_sessions = instructors * sessions_per_instructor
+    codes = rng.sample(range(10000, 100000), total_sessions)
+    now = datetime.utcnow()
+    sessions = []
+    for i, instructor in enumerate(instructor_users):
+        for j in range(sessions_per_instructor):
+            sessions.append(Session(
+                session_id=str(codes[i * sessions_per_instructor + j]),
+                name=f"{rng.choice(COURSES)} - Week {j + 1}",
+                instructor_id=instructor.user_id,
+                institution_id=institution,
+                created_at=now - timedelta(days=7 * (sessions_per_instructor - j)),
+            ))
+    db.session.add_all(sessions)
+    db.session.commit()
+
+    # Each student attends a random share of sessions, a few minutes after start
+    attendance_rows = 0
+    pending = []
+    student_ids = [s.user_id for s in student_users]
+    for session in sessions:
+        attendees = rng.sample(student_ids, int(len(student_ids) * attendance_rate))
+        for student_id in attendees:
+            pending.append({
+                "student_id": student_id,
+                "session_id": session.session_id,
+                "institution_id": institution,
+                "timestamp": session.created_at + timedelta(seconds=rng.randint(0, 900)),
+            })
+        if len(pending) >= batch_size:
+            db.session.execute(db.insert(Attendance), pending)
+            attendance_rows += len(pending)
+            pending = []
+    if pending:
+        db.session.execute(db.insert(Attendance), pending)
+        attendance_rows += len(pending)
+    db.session.commit()
+
+    return {
+        "institution": institution,
+        "admins": admins,
+        "instructors": instructors,
+        "students": students,
+        "sessions": total_sessions,
+        "attendance": attendance_rows,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic data.")
+    parser.add_argument("--database-url", required=True,
+                        help="SQLite or local PostgreSQL URL (e.g. sqlite:///bench.db)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--instructors", type=int, default=20)
+    parser.add_argument("--sessions-per-instructor", type=int, default=10)
+    parser.add_argument("--attendance-rate", type=float, default=0.8)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--institution", default=DEFAULT_INSTITUTION, help="Institution (tenant) code")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Drop all tables first")
+    args = parser.parse_args(argv)
+
+    app = build_app(args.database_url)
+    with app.app_context():
+        summary = seed(
+            students=args.students,
+            instructors=args.instructors,
+            sessions_per_instructor=args.sessions_per_instructor,
+            attendance_rate=args.attendance_rate,
+            admins=args.admins,
+            reset=args.reset,
+            rng_seed=args.seed,
+            institution=args.institution,
+        )
+    print(f"✅ Seeded: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Check-in throughput across institution shards.
+
+Seeds two institutions into separate SQLite shards (and both into one shared
+file for comparison), then runs check-in workers as separate processes:
+
+  one_shard        one institution on its own shard, ``--workers`` processes
+  two_shards       two institutions on two shards, ``2 * --workers`` processes
+  two_on_one_file  the same two institutions sharing one database file
+
+With shard routing, ``two_shards`` should deliver roughly twice the check-ins
+per second of ``one_shard``; ``two_on_one_file`` shows the single-database
+ceiling it avoids.
+
+Usage (from the backend directory):
+    python -m bench.tenant_shard_bench --dir /tmp/shards --workers 2
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.harness import run_metadata, summarize, write_report
+from bench.seed import build_app, seed
+
+TENANTS = ("uon", "ku")
+
+
+def _worker(overrides, tenant, student_ids, instructor_id, rounds, barrier, results):
+    """One process: create sessions as the instructor, then check students in."""
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+
+    app = create_app(overrides)
+    with app.app_context():
+        claims = {"institution": tenant}
+        instructor_token = create_access_token(identity=instructor_id, additional_claims=claims)
+        student_tokens = [create_access_token(identity=s, additional_claims=claims) for s in student_ids]
+    client = app.test_client()
+
+    codes = []
+    for i in range(rounds):
+        response = client.post("/api/sessions", json={"name": f"Shard Bench {i}"},
+                               headers={"Authorization": f"Bearer {instructor_token}"})
+        codes.append(response.get_json()["session_id"])
+
+    barrier.wait()
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for code in codes:
+        for token in student_tokens:
+            t0 = time.perf_counter()
+            response = client.post("/api/attendance", json={"session_id": code},
+                                   headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - t0)
+            errors += response.status_code != 201
+    results.put((latencies, errors, time.perf_counter() - start))
+
+
+def run_scenario(overrides, assignments, rounds):
+    """Run one worker per ``(tenant, students, instructor)`` and merge results."""
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(len(assignments))
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(overrides, tenant, students, instructor, rounds, barrier, results))
+        for tenant, students, instructor in assignments
+    ]
+    for p in procs:
+        p.start()
+    merged, errors, wall = [], 0, 0.0
+    for _ in procs:
+        latencies, worker_errors, elapsed = results.get()
+        merged.extend(latencies)
+        errors += worker_errors
+        wall = max(wall, elapsed)
+    for p in procs:
+        p.join()
+    return summarize(merged, wall, errors, 0)
+
+
+def seed_shard(url, tenants, students, instructors):
+    """Seed ``tenants`` into the database at ``url`` and return their ids."""
+    from extensions.extensions import db
+    from models.models import User
+
+    app = build_app(url)
+    ids = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for tenant in tenants:
+            seed(students=students, instructors=instructors, sessions_per_instructor=1,
+                 attendance_rate=0.0, institution=tenant)
+            ids[tenant] = (
+                [u.user_id for u in User.query.filter_by(institution_id=tenant, role="student")],
+                [u.user_id for u in User.query.filter_by(institution_id=tenant, role="instructor")],
+            )
+    return ids
+
+
+def assign(ids, tenants, workers_per_tenant):
+    """Split each tenant's students across its workers, one instructor each."""
+    assignments = []
+    for tenant in tenants:
+        students, instructors = ids[tenant]
+        for w in range(workers_per_tenant):
+            assignments.append((tenant, students[w::workers_per_tenant], instructors[w]))
+    return assignments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check-in scaling across tenant shards.")
+    parser.add_argument("--dir", default="shard_bench", help="Directory for the SQLite files")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes per institution")
+    parser.add_argument("--students", type=int, default=200, help="Students per institution")
+    parser.add_argument("--rounds", type=int, default=3, help="Sessions each worker checks into")
+    parser.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    if (os.cpu_count() or 1) < 2 * args.workers:
+        print(f"⚠️ {os.cpu_count()} CPU(s) for {2 * args.workers} workers: scaling will be CPU-bound, not shard-bound.")
+
+    os.makedirs(args.dir, exist_ok=True)
+    url = lambda name: "sqlite:///" + os.path.abspath(os.path.join(args.dir, f"{name}.db"))
+    instructors = max(args.workers, 1)
+
+    shard_ids = {}
+    shard_ids.update(seed_shard(url("shard_a"), ["uon"], args.students, instructors))
+    shard_ids.update(seed_shard(url("shard_b"), ["ku"], args.students, instructors))
+    shared_ids = seed_shard(url("shared"), list(TENANTS), args.students, instructors)
+    seed_shard(url("main"), [], 0, 0)
+
+    sharded = {
+        "SQLALCHEMY_DATABASE_URI": url("main"),
+        "SQLALCHEMY_BINDS": {"shard_a": url("shard_a"), "shard_b": url("shard_b")},
+        "TENANT_SHARDS": {"uon": "shard_a", "ku": "shard_b"},
+    }
+    shared = {
+        "SQLALCHEMY_DATABASE_URI": url("main"),
+        "SQLALCHEMY_BINDS": {"shared": url("shared")},
+        "TENANT_SHARDS": {"uon": "shared", "ku": "shared"},
+    }
+
+    scenarios = {
+        "one_shard": run_scenario(sharded, assign(shard_ids, ["uon"], args.workers), args.rounds),
+        "two_shards": run_scenario(sharded, assign(shard_ids, list(TENANTS), args.workers), args.rounds),
+        "two_on_one_file": run_scenario(shared, assign(shared_ids, list(TENANTS), args.workers), args.rounds),
+    }
+    base = scenarios["one_shard"]["throughput_rps"] or 1
+    for name, result in scenarios.items():
+        print(f"{name:<18} {result['throughput_rps']:>9} check-ins/s  x{result['throughput_rps'] / base:.2f}")
+
+    write_report({
+        "meta": run_metadata(workers_per_institution=args.workers, students=args.students, rounds=args.rounds),
+        "scenarios": scenarios,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,14 @@ if os.path.exists(dotenv_path):
 else:
     print("❌ .env NOT found!")
 
+def parse_pairs(value):
+    """Parse ``"a=1,b=2"`` into ``{"a": "1", "b": "2"}``."""
+    pairs = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        key, _, item = entry.partition("=")
+        pairs[key.strip()] = item.strip()
+    return pairs
+
 class Config:
     """Flask Configuration"""
 
@@ -34,8 +42,55 @@ class Config:
 
     # Set database URI
     SQLALCHEMY_DATABASE_URI = database_url
+
+    # Optional read replica for dashboard and admin reads
+    replica_url = os.getenv("DATABASE_REPLICA_URL")
+    if replica_url and replica_url.startswith("postgres://"):
+        replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_BINDS = {"replica": replica_url} if replica_url else {}
+
+    # Optional institution shards, e.g.
+    #   SHARD_DATABASE_URLS="shard_a=postgresql://...,shard_b=postgresql://..."
+    #   TENANT_SHARDS="uon=shard_a,ku=shard_b"
+    # Institutions not listed stay on DATABASE_URL.
+    SQLALCHEMY_BINDS.update(parse_pairs(os.getenv("SHARD_DATABASE_URLS", "")))
+    TENANT_SHARDS = parse_pairs(os.getenv("TENANT_SHARDS", ""))
+
+    # Seconds a user keeps reading from the primary after their own write
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Per-worker check-in cache: "exact", "bloom" or "off"
+    CHECKIN_CACHE = os.getenv("CHECKIN_CACHE", "exact")
+    CHECKIN_CACHE_MAX_SESSIONS = int(os.getenv("CHECKIN_CACHE_MAX_SESSIONS", "1000"))
+    CHECKIN_CACHE_TTL_SECONDS = float(os.getenv("CHECKIN_CACHE_TTL_SECONDS", "300"))
+    CHECKIN_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("CHECKIN_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+
+    # Background jobs (run workers with ``flask jobs work``)
+    #   JOB_CONCURRENCY="export_attendance=1,delete_user=2" caps running jobs per kind
+    JOB_CONCURRENCY = parse_pairs(os.getenv("JOB_CONCURRENCY", ""))
+    JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "2"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+    JOB_RESULTS_DIR = os.getenv(
+        "JOB_RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "job_results")
+    )
+
+    # Bulk QR sheets: render processes per web worker (0 = one per core)
+    QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", "0"))
+    QR_SHEET_MAX_SESSIONS = int(os.getenv("QR_SHEET_MAX_SESSIONS", "1000"))
+
+    # Request profiling: admins send "X-Profile: 1"; PROFILE_SAMPLE_RATE (0-1)
+    # also profiles a random share of requests. Results: /api/admin/profiles
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") == "1"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+    # Change feed (/api/changes): compaction (the compact_change_log job)
+    # drops tombstones older than this, so clients must sync more often
+    CHANGE_LOG_TOMBSTONE_DAYS = float(os.getenv("CHANGE_LOG_TOMBSTONE_DAYS", "30"))
+
     # Secret keys
     SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_hex(32))
     JWT_SECRET_KEY = SECRET_KEY
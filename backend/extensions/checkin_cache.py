@@ -0,0 +1,222 @@
+"""Per-worker cache answering repeat and invalid check-ins without the database.
+
+For each session code a student scans, the worker remembers whether the code
+exists and which students have already checked in. Repeat scans are answered
+from memory. A student missing from the seen set is definitely new to this
+worker, so the check-in is inserted without asking the database first; the
+unique index on (institution, session, student) rejects duplicates written
+by other workers.
+
+Two seen-set implementations are available (``CHECKIN_CACHE``):
+
+  exact  a set of 64-bit digests of student ids; hits and misses are definite
+  bloom  a Bloom filter; about 1.2 bytes per student at a 1% false-positive
+         rate. Misses are definite, but a hit is only "maybe", so hits are
+         confirmed in the database
+
+Entries expire after ``CHECKIN_CACHE_TTL_SECONDS`` so deletions made through
+another worker are picked up. Unknown codes are cached for
+``CHECKIN_CACHE_NEGATIVE_TTL_SECONDS``.
+"""
+import hashlib
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+VALID = "valid"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+
+def _digest(student_id):
+    return int.from_bytes(hashlib.blake2b(student_id.encode(), digest_size=8).digest(), "little")
+
+
+class ExactSeenSet:
+    """Exact membership using 64-bit digests (collisions are negligible)."""
+
+    definite = True
+    full = False
+
+    def __init__(self):
+        self._items = set()
+
+    def add(self, student_id):
+        self._items.add(_digest(student_id))
+
+    def __contains__(self, student_id):
+        return _digest(student_id) in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def nbytes(self):
+        # The set's table plus one int object per member
+        return sys.getsizeof(self._items) + sum(sys.getsizeof(i) for i in self._items)
+
+
+class BloomSeenSet:
+    """Bloom filter sized for ``capacity`` students at ``error_rate``."""
+
+    definite = False
+
+    def __init__(self, capacity=256, error_rate=0.01):
+        self.capacity = max(capacity, 64)
+        self.bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self._members = 0
+
+    def _positions(self, student_id):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(student_id.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, student_id):
+        for pos in self._positions(student_id):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self._members += 1
+
+    def __contains__(self, student_id):
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(student_id))
+
+    def __len__(self):
+        return self._members
+
+    @property
+    def full(self):
+        """Past capacity the false-positive rate climbs above the target."""
+        return self._members >= self.capacity
+
+    def nbytes(self):
+        return sys.getsizeof(self._array)
+
+
+class _Entry:
+    __slots__ = ("valid", "seen", "expires")
+
+    def __init__(self, valid, seen, expires):
+        self.valid = valid
+        self.seen = seen
+        self.expires = expires
+
+
+class CheckinCache:
+    """LRU of session codes -> validity and seen students, keyed per institution."""
+
+    def __init__(self, kind="exact", max_sessions=1000, ttl=300, negative_ttl=5,
+                 bloom_capacity=512, bloom_error_rate=0.01):
+        self.kind = kind
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _new_seen_set(self, expected=0):
+        if self.kind == "bloom":
+            return BloomSeenSet(max(self.bloom_capacity, expected * 2), self.bloom_error_rate)
+        return ExactSeenSet()
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+
+    def session_state(self, institution, code):
+        """VALID, INVALID or UNKNOWN (not cached / expired)."""
+        with self._lock:
+            entry = self._get((institution, code))
+            if entry is None:
+                self.misses += 1
+                return UNKNOWN
+            self.hits += 1
+            return VALID if entry.valid else INVALID
+
+    def has_seen(self, institution, code, student_id):
+        """True if definitely checked in, None if maybe (Bloom hit), else False."""
+        with self._lock:
+            entry = self._get((institution, code))
+            if entry is None or not entry.valid or student_id not in entry.seen:
+                return False
+            return True if entry.seen.definite else None
+
+    def warm(self, institution, code, exists, student_ids=()):
+        """Store what the database said about ``code``."""
+        now = time.monotonic()
+        with self._lock:
+            if not exists:
+                self._put((institution, code), _Entry(False, None, now + self.negative_ttl))
+                return
+            seen = self._new_seen_set(len(student_ids))
+            for student_id in student_ids:
+                seen.add(student_id)
+            self._put((institution, code), _Entry(True, seen, now + self.ttl))
+
+    def add_session(self, institution, code):
+        """A session created by this worker starts with nobody checked in."""
+        self.warm(institution, code, True)
+
+    def mark_seen(self, institution, code, student_id):
+        with self._lock:
+            key = (institution, code)
+            entry = self._get(key)
+            if entry is not None and entry.valid:
+                entry.seen.add(student_id)
+                if entry.seen.full:
+                    # A Bloom filter can't be resized in place; re-warm from
+                    # the database into a larger one on the next scan
+                    del self._entries[key]
+
+    def invalidate(self, institution=None, code=None):
+        """Forget one session, or everything when no code is given."""
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((institution, code), None)
+
+    def memory_bytes(self):
+        """Approximate bytes held by seen sets, per valid session."""
+        with self._lock:
+            return {f"{inst}:{code}": e.seen.nbytes() for (inst, code), e in self._entries.items() if e.valid}
+
+
+def init_checkin_cache(app):
+    """Create this worker's cache from config; ``CHECKIN_CACHE=off`` disables it."""
+    kind = app.config.get("CHECKIN_CACHE", "exact")
+    cache = None
+    if kind != "off":
+        cache = CheckinCache(
+            kind=kind,
+            max_sessions=app.config.get("CHECKIN_CACHE_MAX_SESSIONS", 1000),
+            ttl=app.config.get("CHECKIN_CACHE_TTL_SECONDS", 300),
+            negative_ttl=app.config.get("CHECKIN_CACHE_NEGATIVE_TTL_SECONDS", 5),
+        )
+    app.extensions["checkin_cache"] = cache
+
+
+def checkin_cache():
+    """The current app's cache, or None when disabled."""
+    return current_app.extensions.get("checkin_cache")
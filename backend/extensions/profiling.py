@@ -0,0 +1,223 @@
+"""On-demand request profiling.
+
+A request is profiled when an admin sends the ``X-Profile: 1`` header (the
+role comes from the JWT ``role`` claim), or at random for a
+``PROFILE_SAMPLE_RATE`` share of requests. cProfile runs from the first
+``before_request`` hook to the end of the view, and every SQL statement the
+request executes is timed. The top functions and statements are kept in a
+per-worker ring buffer of ``PROFILE_BUFFER_SIZE`` entries, served by the
+``/api/admin/profiles`` routes, and each entry can be downloaded in the
+collapsed-stack format read by flamegraph.pl and speedscope. Each profile
+belongs to the institution of the request, and admins only see their own.
+
+With ``PROFILING_ENABLED`` off no hooks are installed at all. When enabled,
+an unprofiled request costs one header lookup (plus a random draw when
+sampling). The SQL timing listeners are only attached to the engines by the
+first profiled request; from then on each statement costs one ``g`` lookup.
+"""
+import cProfile
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from sqlalchemy import event
+
+from extensions.extensions import db
+from extensions.tenancy import current_institution
+
+HEADER = "X-Profile"
+
+# Profiles and their own endpoints are never profiled
+_SKIP_PREFIX = "/api/admin/profiles"
+
+# cProfile can only be active in one thread at a time on Python 3.12+
+_active = threading.Lock()
+_listeners_lock = threading.Lock()
+
+
+class ProfileStore:
+    """Bounded, thread-safe ring buffer of finished profiles."""
+
+    def __init__(self, size):
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._items.append(profile)
+
+    def list(self, institution):
+        with self._lock:
+            return [p for p in reversed(self._items) if p["institution"] == institution]
+
+    def get(self, profile_id, institution):
+        with self._lock:
+            return next((p for p in self._items
+                         if p["id"] == profile_id and p["institution"] == institution), None)
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        # Built-ins such as <method 'execute' of 'sqlite3.Cursor' objects>
+        return name
+    return f"{name} ({filename}:{line})"
+
+
+def top_functions(stats, limit):
+    """The ``limit`` functions with the most cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        "function": _label(func),
+        "calls": nc,
+        "own_ms": round(tt * 1000, 3),
+        "cumulative_ms": round(ct * 1000, 3),
+    } for func, (cc, nc, tt, ct, callers) in rows]
+
+
+def folded_stacks(stats, max_depth=64, min_seconds=1e-5):
+    """Collapsed stacks (``a;b;c <microseconds>``) built from cProfile data.
+
+    cProfile records caller/callee edges rather than full stacks, so each
+    function's own time is split between its callers in proportion to the
+    time spent under each call edge, as flameprof and similar tools do.
+    Subtrees under ``min_seconds`` are dropped to keep the walk bounded.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_ct))
+    roots = [func for func, (_, _, _, _, callers) in stats.stats.items() if not callers]
+
+    lines = {}
+
+    def walk(func, stack, share):
+        _, _, own, cumulative, _ = stats.stats[func]
+        stack = stack + [_label(func).replace(";", ",")]
+        micros = int(own * share * 1_000_000)
+        if micros:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0) + micros
+        if len(stack) >= max_depth or cumulative * share < min_seconds:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = stats.stats[callee][3]
+            if callee_ct and _label(callee).replace(";", ",") not in stack:
+                walk(callee, stack, share * edge_ct / callee_ct)
+
+    for root in roots:
+        walk(root, [], 1.0)
+    return "\n".join(f"{stack} {micros}" for stack, micros in sorted(lines.items())) + "\n"
+
+
+def _wants_profile():
+    if request.path.startswith(_SKIP_PREFIX):
+        return None
+    if request.headers.get(HEADER) == "1":
+        try:
+            verify_jwt_in_request(optional=True)
+            if get_jwt().get("role") == "admin":
+                return "header"
+        except Exception:
+            # Bad tokens are the view's problem; just don't profile
+            pass
+    rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    if rate and random.random() < rate:
+        return "sample"
+    return None
+
+
+def _start_profile():
+    trigger = _wants_profile()
+    if trigger is None or not _active.acquire(blocking=False):
+        return
+    _attach_sql_listeners()
+    profiler = cProfile.Profile()
+    g.profile = {"trigger": trigger, "profiler": profiler, "sql": {}, "started": time.perf_counter()}
+    profiler.enable()
+
+
+def _finish_profile(response):
+    state = g.pop("profile", None)
+    if state is None:
+        return response
+    state["profiler"].disable()
+    _active.release()
+    duration = time.perf_counter() - state["started"]
+
+    config = current_app.config
+    stats = pstats.Stats(state["profiler"])
+    statements = sorted(state["sql"].items(), key=lambda item: item[1][1], reverse=True)
+    current_app.extensions["profiles"].add({
+        "id": uuid.uuid4().hex[:12],
+        # Paths, SQL and timings are the institution's own business
+        "institution": current_institution(),
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "trigger": state["trigger"],
+        "duration_ms": round(duration * 1000, 3),
+        "recorded_at": datetime.utcnow().isoformat(),
+        "sql_count": sum(count for count, _ in state["sql"].values()),
+        "sql_ms": round(sum(total for _, total in state["sql"].values()) * 1000, 3),
+        "top_functions": top_functions(stats, config.get("PROFILE_TOP_FUNCTIONS", 30)),
+        "top_sql": [{
+            "statement": statement[:500],
+            "count": count,
+            "total_ms": round(total * 1000, 3),
+        } for statement, (count, total) in statements[:config.get("PROFILE_TOP_SQL", 20)]],
+        "folded": folded_stacks(stats),
+    })
+    return response
+
+
+def _abandon_profile(exc):
+    # Only reached with a live profile if after_request never ran
+    state = g.pop("profile", None)
+    if state is not None:
+        state["profiler"].disable()
+        _active.release()
+
+
+def _before_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        conn.info.setdefault("profile_sql_start", []).append(time.perf_counter())
+
+
+def _after_sql(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        starts = conn.info.get("profile_sql_start")
+        if starts:
+            elapsed = time.perf_counter() - starts.pop()
+            count, total = g.profile["sql"].get(statement, (0, 0.0))
+            g.profile["sql"][statement] = (count + 1, total + elapsed)
+
+
+def _attach_sql_listeners():
+    """Time SQL on every engine of this app (idempotent)."""
+    with _listeners_lock:
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _before_sql):
+                event.listen(engine, "before_cursor_execute", _before_sql)
+                event.listen(engine, "after_cursor_execute", _after_sql)
+
+
+def init_profiling(app):
+    """Install the request hooks when ``PROFILING_ENABLED`` is set."""
+    app.extensions["profiles"] = ProfileStore(app.config.get("PROFILE_BUFFER_SIZE", 50))
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abandon_profile)
+
+
+def profile_store():
+    return current_app.extensions["profiles"]
@@ -0,0 +1,199 @@
+"""QR code rendering, single and in bulk.
+
+Rasterizing a QR code is pure CPU work, so bulk sheets are rendered in a
+process pool (``QR_RENDER_WORKERS`` processes, default one per core) and
+packed into a ZIP of PNGs or a printable multi-page PDF. The pool is created
+on first use and reused for the life of the web worker; small batches and
+``QR_RENDER_WORKERS=1`` render in-process instead.
+"""
+import atexit
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import qrcode
+from flask import current_app
+from flask.cli import AppGroup
+from PIL import Image, ImageDraw, ImageFont
+
+from extensions.tenancy import set_tenant
+
+# Scanned codes open this API's check-in URL
+API_BASE_URL = os.getenv("API_BASE_URL", "https://classattendanceqrcodesystem.onrender.com")
+
+# Below this many codes the pool's IPC costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+# A4 at 150 dpi, two columns by three rows; cards fit without rescaling,
+# which would blur the modules
+PAGE_SIZE = (1240, 1754)
+PAGE_GRID = (2, 3)
+PAGE_MARGIN = 60
+
+_pool = None
+_pool_workers = 0  # max_workers of _pool
+_pool_lock = threading.Lock()
+
+
+def attendance_url(session_code):
+    """What a session's QR code encodes."""
+    return f"{API_BASE_URL}/api/attendance/mark/{session_code}"
+
+
+def render_qr(data):
+    """The QR code for ``data`` as a PIL image (same settings as /api/qr)."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.make_image(fill="black", back_color="white").get_image()
+
+
+def render_png(data):
+    """PNG bytes of the QR code for ``data``."""
+    out = io.BytesIO()
+    render_qr(data).save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_card(item):
+    """PNG bytes of one captioned card; ``item`` is ``(data, caption)``.
+
+    Module-level so it can be sent to pool processes.
+    """
+    data, caption = item
+    code = render_qr(data).convert("L")
+    font = ImageFont.load_default(size=24)
+    card = Image.new("L", (code.width, code.height + 50), 255)
+    card.paste(code, (0, 0))
+    draw = ImageDraw.Draw(card)
+    # Trim long session names to the card width
+    while caption and draw.textlength(caption, font=font) > card.width - 20:
+        caption = caption[:-2] + "…"
+    draw.text((card.width // 2, code.height + 10), caption, fill=0, font=font, anchor="ma")
+    out = io.BytesIO()
+    card.save(out, format="PNG", optimize=False)
+    return out.getvalue()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned (not forked) children: web workers hold threads and DB connections
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_cards(items, workers=None):
+    """Render ``(data, caption)`` items to PNG bytes, in order."""
+    if workers is None:
+        workers = current_app.config.get("QR_RENDER_WORKERS") or os.cpu_count() or 1
+    if workers <= 1 or len(items) < PARALLEL_THRESHOLD:
+        return [render_card(item) for item in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    return list(_get_pool(workers).map(render_card, items, chunksize=chunksize))
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")[:40] or "session"
+
+
+def zip_sheet(codes, captions, cards):
+    """ZIP of one PNG per session, named ``<code>_<caption>.png``."""
+    out = io.BytesIO()
+    # PNGs are already compressed; storing them avoids a second pass
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+        for code, caption, png in zip(codes, captions, cards):
+            archive.writestr(f"{code}_{_slug(caption)}.png", png)
+    out.seek(0)
+    return out
+
+
+def pdf_sheet(cards):
+    """Printable A4 PDF with a grid of captioned cards on each page."""
+    columns, rows = PAGE_GRID
+    cell_w = (PAGE_SIZE[0] - 2 * PAGE_MARGIN) // columns
+    cell_h = (PAGE_SIZE[1] - 2 * PAGE_MARGIN) // rows
+    per_page = columns * rows
+    pages = []
+    for start in range(0, len(cards), per_page):
+        page = Image.new("L", PAGE_SIZE, 255)
+        for slot, png in enumerate(cards[start:start + per_page]):
+            card = Image.open(io.BytesIO(png))
+            card.thumbnail((cell_w - 10, cell_h - 10))
+            x = PAGE_MARGIN + (slot % columns) * cell_w + (cell_w - card.width) // 2
+            y = PAGE_MARGIN + (slot // columns) * cell_h + (cell_h - card.height) // 2
+            page.paste(card, (x, y))
+        # Bilevel pages are stored losslessly and are ~20x smaller than
+        # greyscale, which Pillow would JPEG-encode
+        pages.append(page.convert("1", dither=Image.Dither.NONE))
+    if not pages:
+        pages.append(Image.new("1", PAGE_SIZE, 1))
+    out = io.BytesIO()
+    pages[0].save(out, format="PDF", resolution=150, save_all=True, append_images=pages[1:])
+    out.seek(0)
+    return out
+
+
+def build_sheet(sessions, fmt, workers=None):
+    """Render ``(code, name)`` pairs as a ``"zip"`` or ``"pdf"`` sheet.
+
+    Returns ``(file, mimetype, filename)``.
+    """
+    codes = [code for code, _ in sessions]
+    captions = [name for _, name in sessions]
+    cards = render_cards([(attendance_url(code), name) for code, name in sessions], workers)
+    if fmt == "pdf":
+        return pdf_sheet(cards), "application/pdf", "qr_codes.pdf"
+    return zip_sheet(codes, captions, cards), "application/zip", "qr_codes.zip"
+
+
+qr_cli = AppGroup("qr", help="QR code commands.")
+
+
+@qr_cli.command("sheet")
+@click.option("--instructor-id", help="Every session of this instructor.")
+@click.option("--session-id", "session_ids", multiple=True, help="Session code (repeatable).")
+@click.option("--institution", help="Institution the sessions belong to.")
+@click.option("--format", "fmt", type=click.Choice(["zip", "pdf"]), default="pdf", show_default=True)
+@click.option("--workers", type=int, help="Render processes (default QR_RENDER_WORKERS or one per core).")
+@click.option("--output", required=True, help="File to write.")
+def sheet_command(instructor_id, session_ids, institution, fmt, workers, output):
+    """Write QR codes for many sessions to a ZIP or PDF."""
+    # Imported here so pool processes, which import this module, skip the models
+    from models.models import Session
+
+    if institution:
+        set_tenant(institution)
+    query = Session.query.with_entities(Session.session_id, Session.name)
+    if instructor_id:
+        query = query.filter(Session.instructor_id == instructor_id)
+    if session_ids:
+        query = query.filter(Session.session_id.in_(session_ids))
+    if not instructor_id and not session_ids:
+        raise click.UsageError("Give --instructor-id and/or --session-id.")
+    sessions = query.order_by(Session.created_at).all()
+
+    sheet, _, _ = build_sheet(sessions, fmt, workers)
+    with open(output, "wb") as f:
+        f.write(sheet.getvalue())
+    print(f"🖨️ Wrote {len(sessions)} QR code(s) to {output}")
@@ -0,0 +1,128 @@
+"""Read-replica routing for the shared ``db`` session.
+
+When a ``replica`` bind is configured (``DATABASE_REPLICA_URL``), SELECTs issued
+by views wrapped in :func:`read_only` go to the replica engine. Everything else
+(flushes, INSERT/UPDATE/DELETE, views without the decorator) stays on the
+primary. A user who committed a write within ``REPLICA_STICKY_SECONDS`` keeps
+reading from the primary so they always see their own changes. The write time
+travels with the client, not the worker: responses to a write carry a signed
+marker in the ``X-Last-Write`` header and a ``last_write`` cookie, and a read
+that sends either back on any worker is routed to the primary.
+
+Requests for an institution on another shard (see ``extensions.tenancy``) go
+to that shard's bind, and to ``<shard>_replica`` for read-only views when one
+is configured.
+"""
+import math
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session as FlaskSession
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+from extensions.tenancy import current_tenant, shard_for
+
+REPLICA_BIND = "replica"
+
+# Where clients send back the marker of their last write
+WRITE_MARKER_HEADER = "X-Last-Write"
+WRITE_MARKER_COOKIE = "last_write"
+
+
+class RoutingSession(FlaskSession):
+    """Session that picks the tenant's shard and, for reads, its replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None or not has_app_context():
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        engines = self._db.engines
+        shard = shard_for(current_tenant())
+        replica = REPLICA_BIND if shard is None else f"{shard}_{REPLICA_BIND}"
+        if (
+            not self._flushing
+            and isinstance(clause, Select)
+            and g.get("use_replica", False)
+            and replica in engines
+        ):
+            return engines[replica]
+        if shard is not None:
+            return engines[shard]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flag_flush(session, flush_context):
+    """Remember that this request wrote, so the writer sticks to the primary."""
+    if has_request_context():
+        g.wrote = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    """Bulk UPDATE/DELETE/INSERT statements count as writes too."""
+    if has_request_context() and not orm_execute_state.is_select:
+        g.wrote = True
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # No JWT verified for this request (e.g. register)
+        return None
+
+
+def _marker_serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="replica-last-write")
+
+
+def wrote_recently(identity):
+    """True if the request carries ``identity``'s write marker from within the sticky window."""
+    if identity is None:
+        return False
+    marker = request.headers.get(WRITE_MARKER_HEADER) or request.cookies.get(WRITE_MARKER_COOKIE)
+    if not marker:
+        return False
+    window = current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+    try:
+        # Markers are signed with SECRET_KEY, which every worker shares
+        return _marker_serializer().loads(marker, max_age=window) == identity
+    except BadSignature:
+        # Forged, expired or issued to someone else
+        return False
+
+
+def _note_writer(response):
+    if g.get("wrote"):
+        identity = _current_identity()
+        if identity is not None:
+            marker = _marker_serializer().dumps(identity)
+            window = current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+            response.headers[WRITE_MARKER_HEADER] = marker
+            # Cross-site cookies (the frontend is on another origin) must be Secure
+            response.set_cookie(
+                WRITE_MARKER_COOKIE, marker, max_age=max(1, math.ceil(window)), httponly=True,
+                secure=request.is_secure, samesite="None" if request.is_secure else "Lax",
+            )
+    return response
+
+
+def read_only(view):
+    """Route the view's SELECTs to the replica unless the user just wrote.
+
+    Apply below ``@jwt_required()`` so the caller's identity is available.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = not wrote_recently(_current_identity())
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_routing(app):
+    """Register the hook that records recent writers for read-your-writes."""
+    app.after_request(_note_writer)
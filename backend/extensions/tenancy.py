@@ -0,0 +1,53 @@
+"""Institution (tenant) context and shard routing.
+
+The tenant for a request comes from the ``institution`` claim in the JWT, or
+is set explicitly with :func:`set_tenant` by views that run before a token
+exists (login, register) and by background jobs. Otherwise there is no
+tenant, so CLI tools and scripts see every institution on the engine they
+are bound to.
+
+Each tenant maps to a shard bind key (``None`` is the default database). The
+mapping comes from ``TENANT_SHARDS`` in the config, and can be replaced by a
+callable in ``TENANT_SHARD_RESOLVER`` (``code -> bind key or None``).
+"""
+from flask import current_app, g, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt
+
+DEFAULT_INSTITUTION = "default"
+
+
+def set_tenant(code):
+    """Pin the current request (or app context) to institution ``code``."""
+    g.tenant = code
+
+
+def current_tenant():
+    """Institution code for the current context, or None when unscoped."""
+    if not has_app_context():
+        return None
+    if "tenant" in g:
+        return g.tenant
+    if not has_request_context():
+        return None
+    try:
+        claims = get_jwt()
+    except RuntimeError:
+        # No JWT verified yet for this request
+        return None
+    # Tokens issued before tenancy existed belong to the default institution
+    return claims.get("institution", DEFAULT_INSTITUTION)
+
+
+def current_institution():
+    """Column default for ``institution_id``: the request tenant or the default."""
+    return current_tenant() or DEFAULT_INSTITUTION
+
+
+def shard_for(code):
+    """Bind key of the database holding ``code``; None means the default engine."""
+    if code is None:
+        return None
+    resolver = current_app.config.get("TENANT_SHARD_RESOLVER")
+    if resolver is not None:
+        return resolver(code)
+    return current_app.config.get("TENANT_SHARDS", {}).get(code)
@@ -0,0 +1,213 @@
+"""Job kinds. Each handler runs in the job's institution and may be retried
+after a crash, so it must be safe to run again from the start."""
+import csv
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import exists, func
+from sqlalchemy.orm import aliased
+from werkzeug.security import generate_password_hash
+
+from extensions.extensions import db
+from jobs.runner import job_handler
+from models.models import Attendance, ChangeLog, ChangeLogFloor, Course, Enrollment, Session, User
+
+BATCH_SIZE = 1000
+
+
+@job_handler("delete_user")
+def delete_user(ctx):
+    """Delete a non-admin user, their check-ins, sessions, courses and enrollments."""
+    user_id = ctx.payload["user_id"]
+    user = User.query.filter_by(user_id=user_id).first()
+    if not user:
+        # Already deleted by an earlier attempt
+        ctx.result = {"deleted": False}
+        return
+    if user.role == "admin":
+        raise ValueError("Cannot delete an admin user")
+
+    codes = [code for (code,) in db.session.query(Session.session_id).filter_by(instructor_id=user_id)]
+    attendance = Attendance.query.filter(
+        (Attendance.student_id == user_id) | Attendance.session_id.in_(codes)
+    )
+    total = attendance.count() + len(codes) + 1
+    done = 0
+
+    # Small batches keep each transaction (and its locks) short
+    while True:
+        ids = [i for (i,) in attendance.with_entities(Attendance.id).limit(BATCH_SIZE)]
+        if not ids:
+            break
+        Attendance.query.filter(Attendance.id.in_(ids)).delete(synchronize_session=False)
+        done += len(ids)
+        ctx.progress(done, total)
+
+    Session.query.filter_by(instructor_id=user_id).delete(synchronize_session=False)
+    course_ids = [c for (c,) in db.session.query(Course.id).filter_by(instructor_id=user_id)]
+    Enrollment.query.filter(
+        (Enrollment.student_id == user_id) | Enrollment.course_id.in_(course_ids)
+    ).delete(synchronize_session=False)
+    Course.query.filter(Course.id.in_(course_ids)).delete(synchronize_session=False)
+    db.session.delete(user)
+    db.session.commit()
+    # Web workers' check-in caches catch up within CHECKIN_CACHE_TTL_SECONDS
+    ctx.result = {"deleted": True, "attendance_deleted": done, "sessions_deleted": len(codes)}
+
+
+@job_handler("export_attendance")
+def export_attendance(ctx):
+    """Write attendance (optionally one session's or student's) to a CSV file."""
+    query = (
+        db.session.query(Attendance.id, Attendance.student_id, User.username, Attendance.session_id,
+                         Session.name, Attendance.timestamp)
+        .join(User, User.user_id == Attendance.student_id)
+        .join(Session, (Session.institution_id == Attendance.institution_id)
+              & (Session.session_id == Attendance.session_id))
+        .order_by(Attendance.id)
+    )
+    if ctx.payload.get("session_id"):
+        query = query.filter(Attendance.session_id == ctx.payload["session_id"])
+    if ctx.payload.get("student_id"):
+        query = query.filter(Attendance.student_id == ctx.payload["student_id"])
+
+    total = query.count()
+    path = ctx.results_path(".csv")
+    done, last_id = 0, 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "student_id", "student_name", "session_id", "session_name", "timestamp"])
+        # Keyset batches: progress() commits, which would close a server-side
+        # cursor held open across batches
+        while True:
+            rows = query.filter(Attendance.id > last_id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+            for row in rows:
+                writer.writerow([*row[:5], row.timestamp.isoformat() if row.timestamp else ""])
+            done += len(rows)
+            last_id = rows[-1].id
+            ctx.progress(done, total)
+    ctx.result = {"rows": total}
+    ctx.result_location = path
+
+
+def _hash_import_passwords(payload):
+    """Store password hashes, never the plaintext, in the queued payload."""
+    rows = []
+    for row in payload.get("users", []):
+        row = dict(row)
+        if row.get("password"):
+            row["password_hash"] = generate_password_hash(row["password"])
+        row.pop("password", None)
+        rows.append(row)
+    return {**payload, "users": rows}
+
+
+@job_handler("import_users", prepare=_hash_import_passwords)
+def import_users(ctx):
+    """Create users from ``payload["users"]``; existing emails are skipped.
+
+    Rows whose username another user already has are reported in
+    ``errors``. Passwords were hashed when the job was submitted.
+    """
+    rows = ctx.payload.get("users", [])
+    created, skipped, errors = 0, 0, []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        emails = [r.get("email") for r in batch]
+        existing = {e for (e,) in db.session.query(User.email).filter(User.email.in_(emails))}
+        usernames = [r.get("username") for r in batch]
+        taken = {u for (u,) in db.session.query(User.username).filter(User.username.in_(usernames))}
+        for offset, row in enumerate(batch):
+            role = (row.get("role") or "").lower()
+            if not all([row.get("username"), row.get("email"), row.get("password_hash")]) \
+                    or role not in ("student", "instructor", "admin"):
+                errors.append({"row": start + offset, "error": "Missing fields or invalid role."})
+                continue
+            if row["email"] in existing:
+                skipped += 1
+                continue
+            # Usernames are unique too; one clash would fail the whole batch
+            if row["username"] in taken:
+                errors.append({"row": start + offset, "error": "Username already taken."})
+                continue
+            prefix = {"student": "stu", "instructor": "ins", "admin": "adm"}[role]
+            db.session.add(User(
+                username=row["username"],
+                email=row["email"],
+                password=row["password_hash"],
+                role=role,
+                user_id=f"{prefix}_{uuid.uuid4().hex[:5]}",
+            ))
+            existing.add(row["email"])
+            taken.add(row["username"])
+            created += 1
+        db.session.commit()
+        ctx.progress(start + len(batch), len(rows))
+    ctx.result = {"created": created, "skipped": skipped, "errors": errors[:100]}
+
+
+@job_handler("attendance_stats")
+def attendance_stats(ctx):
+    """Check-in counts per session and overall, in one aggregate query."""
+    rows = (
+        db.session.query(Session.session_id, Session.name, func.count(Attendance.id))
+        .outerjoin(Attendance, (Attendance.institution_id == Session.institution_id)
+                   & (Attendance.session_id == Session.session_id))
+        .group_by(Session.session_id, Session.name)
+        .all()
+    )
+    ctx.result = {
+        "sessions": len(rows),
+        "attendance": sum(count for _, _, count in rows),
+        "per_session": [{"session_id": code, "name": name, "attendance": count} for code, name, count in rows],
+    }
+
+
+@job_handler("compact_change_log")
+def compact_change_log(ctx):
+    """Shrink the change feed without changing what any client ends up with.
+
+    Entries superseded by a newer one for the same row are dropped, which is
+    invisible to clients. Tombstones older than ``payload["tombstone_days"]``
+    (default ``CHANGE_LOG_TOMBSTONE_DAYS``) are dropped too, and the floor is
+    raised past them so clients that synced before then are told to resync.
+    """
+    days = float(ctx.payload.get("tombstone_days", current_app.config.get("CHANGE_LOG_TOMBSTONE_DAYS", 30)))
+    newer = aliased(ChangeLog)
+    superseded = ChangeLog.query.filter(exists().where(
+        newer.institution_id == ChangeLog.institution_id,
+        newer.entity == ChangeLog.entity,
+        newer.entity_key == ChangeLog.entity_key,
+        newer.id > ChangeLog.id,
+    ))
+    expired = ChangeLog.query.filter(
+        ChangeLog.op == "delete", ChangeLog.created_at < datetime.utcnow() - timedelta(days=days)
+    )
+
+    total = superseded.count() + expired.count()
+    removed = {"superseded": 0, "tombstones": 0}
+    floor = 0
+    for name, query in (("superseded", superseded), ("tombstones", expired)):
+        while True:
+            ids = [i for (i,) in query.with_entities(ChangeLog.id).order_by(ChangeLog.id).limit(BATCH_SIZE)]
+            if not ids:
+                break
+            if name == "tombstones":
+                floor = max(floor, ids[-1])
+                _raise_change_log_floor(ctx.institution_id, floor)
+            ChangeLog.query.filter(ChangeLog.id.in_(ids)).delete(synchronize_session=False)
+            removed[name] += len(ids)
+            # Commits the batch (and the floor with it)
+            ctx.progress(sum(removed.values()), total)
+    ctx.result = {"removed": removed, "remaining": ChangeLog.query.count(), "floor": floor or None}
+
+
+def _raise_change_log_floor(institution_id, version):
+    row = ChangeLogFloor.query.first()
+    if row is None:
+        db.session.add(ChangeLogFloor(institution_id=institution_id, version=version))
+    elif row.version < version:
+        row.version = version
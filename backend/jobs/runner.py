@@ -0,0 +1,299 @@
+"""Database-backed job queue and worker.
+
+Jobs are rows in the ``jobs`` table. Workers claim the oldest runnable job
+with a compare-and-set UPDATE (``status = 'queued'`` -> ``'running'``), so
+several worker processes can share the queue on SQLite or PostgreSQL without
+extra infrastructure. On PostgreSQL, claims of one kind also take an
+advisory lock, so the per-kind limit holds under concurrent claims.
+
+* Concurrency: ``JOB_CONCURRENCY`` caps running jobs per kind across all
+  workers (``JOB_DEFAULT_CONCURRENCY`` for unlisted kinds); ``--threads`` caps
+  jobs per worker process.
+* Retry: a failed attempt is re-queued with exponential backoff until
+  ``max_attempts`` is reached.
+* Crash recovery: running jobs heartbeat every ``JOB_HEARTBEAT_SECONDS``.
+  Any worker re-queues jobs whose heartbeat is older than
+  ``JOB_STALE_SECONDS``, so a killed worker's jobs are picked up again.
+  Handlers should therefore be idempotent.
+"""
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select, text, update
+
+from extensions.extensions import db
+from extensions.tenancy import set_tenant
+from models.models import Job, JobStatus
+
+# kind -> handler(ctx); filled in by @job_handler in jobs/handlers.py
+HANDLERS = {}
+# kind -> prepare(payload), applied by submit() before the payload is stored
+PREPARERS = {}
+
+# First key of the per-kind advisory locks taken while claiming
+CLAIM_LOCK_NAMESPACE = 0x6A6F62
+
+
+def job_handler(kind, prepare=None):
+    """Register ``func(ctx)`` as the handler for jobs of ``kind``.
+
+    ``prepare(payload)``, if given, returns the payload to store in its place,
+    e.g. with secrets that must not sit in the ``jobs`` table replaced.
+    """
+    def decorator(func):
+        HANDLERS[kind] = func
+        if prepare:
+            PREPARERS[kind] = prepare
+        return func
+    return decorator
+
+
+class JobContext:
+    """What a handler sees: the payload plus progress and result helpers."""
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.payload = job.payload or {}
+        self.attempt = job.attempts  # 1 on the first run
+        self.institution_id = job.institution_id
+        self.result = None
+        self.result_location = None
+
+    def progress(self, done, total):
+        """Record progress (and a heartbeat); commits the current transaction."""
+        percent = 100 if not total else min(99, int(done * 100 / total))
+        db.session.execute(
+            update(Job).where(Job.id == self.job_id).values(progress=percent, heartbeat_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+    def results_path(self, suffix):
+        """File path under ``JOB_RESULTS_DIR`` for this job's output."""
+        directory = current_app.config["JOB_RESULTS_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"job_{self.job_id}{suffix}")
+
+
+def submit(kind, payload=None, submitted_by=None, max_attempts=None):
+    """Queue a job and return it. Runs in the caller's tenant."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    payload = payload or {}
+    if kind in PREPARERS:
+        payload = PREPARERS[kind](payload)
+    job = Job(
+        kind=kind,
+        payload=payload,
+        submitted_by=submitted_by,
+        max_attempts=max_attempts or current_app.config.get("JOB_MAX_ATTEMPTS", 3),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _kind_limit(kind):
+    limits = current_app.config.get("JOB_CONCURRENCY", {})
+    return int(limits.get(kind, current_app.config.get("JOB_DEFAULT_CONCURRENCY", 2)))
+
+
+def _lock_kind(kind):
+    """Serialize claims of one kind until the transaction ends (PostgreSQL).
+
+    Under READ COMMITTED two workers claiming different jobs of a kind would
+    both count the same running jobs and both pass the limit. SQLite runs
+    one writer at a time, so the UPDATE's own count is already safe there.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:kind))"),
+            {"namespace": CLAIM_LOCK_NAMESPACE, "kind": kind},
+        )
+
+
+def claim(worker_id):
+    """Atomically take the oldest runnable job within its kind's limit.
+
+    Returns the job id, or None when nothing is runnable.
+    """
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(Job.id, Job.kind)
+        .where(Job.status == JobStatus.QUEUED.value, Job.run_after <= now)
+        .order_by(Job.id)
+        .limit(20)
+    ).all()
+    for job_id, kind in candidates:
+        _lock_kind(kind)
+        running = (
+            select(func.count(Job.id))
+            .where(Job.kind == kind, Job.status == JobStatus.RUNNING.value)
+            .scalar_subquery()
+        )
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value, running < _kind_limit(kind))
+            .values(
+                status=JobStatus.RUNNING.value,
+                locked_by=worker_id,
+                attempts=Job.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def recover_stale():
+    """Re-queue running jobs whose worker stopped heartbeating. Returns the count."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("JOB_STALE_SECONDS", 60))
+    stale = Job.query.filter(Job.status == JobStatus.RUNNING.value, Job.heartbeat_at < cutoff).all()
+    for job in stale:
+        _finish_attempt(job, f"Worker {job.locked_by} stopped responding")
+    db.session.commit()
+    return len(stale)
+
+
+def _finish_attempt(job, error):
+    """Retry with backoff while attempts remain, otherwise fail the job."""
+    job.error = error
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        job.status = JobStatus.QUEUED.value
+        job.run_after = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+    else:
+        job.status = JobStatus.FAILED.value
+        job.finished_at = datetime.utcnow()
+
+
+def run(job_id):
+    """Execute a claimed job in its institution's context."""
+    job = db.session.get(Job, job_id)
+    set_tenant(job.institution_id)
+    ctx = JobContext(job)
+    try:
+        HANDLERS[job.kind](ctx)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        print(f"❌ Job {job_id} ({job.kind}) attempt {job.attempts} failed: {e}")
+        _finish_attempt(job, "".join(traceback.format_exception_only(type(e), e)).strip())
+        db.session.commit()
+        return False
+
+    job = db.session.get(Job, job_id)
+    job.status = JobStatus.SUCCEEDED.value
+    job.progress = 100
+    job.result = ctx.result
+    job.result_location = ctx.result_location
+    job.error = None
+    job.locked_by = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+class Worker:
+    """Polls the queue from ``threads`` threads and heartbeats running jobs."""
+
+    def __init__(self, app, threads=2, poll_interval=1.0, worker_id=None, institution=None):
+        self.app = app
+        # Only claim this institution's jobs, on its shard (None: every job on the default database)
+        self.institution = institution
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _heartbeat(self):
+        interval = self.app.config.get("JOB_HEARTBEAT_SECONDS", 10)
+        while not self._stop.wait(interval):
+            with self._lock:
+                ids = list(self.running)
+            if not ids:
+                continue
+            with self.app.app_context():
+                if self.institution:
+                    set_tenant(self.institution)
+                db.session.execute(
+                    update(Job).where(Job.id.in_(ids)).values(heartbeat_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+
+    def _loop(self, once):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                if self.institution:
+                    set_tenant(self.institution)
+                recover_stale()
+                job_id = claim(self.worker_id)
+            if job_id is None:
+                if once:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._lock:
+                self.running.add(job_id)
+            try:
+                # Fresh app context per job so the tenant never leaks between jobs
+                with self.app.app_context():
+                    run(job_id)
+            finally:
+                with self._lock:
+                    self.running.discard(job_id)
+
+    def start(self, once=False):
+        """Run until stopped (or, with ``once``, until the queue is empty)."""
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        loops = [threading.Thread(target=self._loop, args=(once,)) for _ in range(self.threads)]
+        for t in loops:
+            t.start()
+        try:
+            for t in loops:
+                while t.is_alive():
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            print("🛑 Stopping worker after current jobs...")
+            self._stop.set()
+            for t in loops:
+                t.join()
+        self._stop.set()
+
+    def stop(self):
+        self._stop.set()
+
+
+jobs_cli = AppGroup("jobs", help="Background job commands.")
+
+
+@jobs_cli.command("work")
+@click.option("--threads", default=2, show_default=True, help="Jobs this worker runs at once.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds between polls when idle.")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+@click.option("--institution", default=None, help="Only run this institution's jobs (for sharded setups).")
+def work_command(threads, poll_interval, once, institution):
+    """Run a job worker against this app's database."""
+    worker = Worker(current_app._get_current_object(), threads=threads, poll_interval=poll_interval,
+                    institution=institution)
+    print(f"👷 Job worker {worker.worker_id} started ({threads} threads)")
+    worker.start(once=once)
+
+
+@jobs_cli.command("recover")
+def recover_command():
+    """Re-queue jobs left running by a dead worker."""
+    print(f"♻️ Re-queued {recover_stale()} stale job(s)")
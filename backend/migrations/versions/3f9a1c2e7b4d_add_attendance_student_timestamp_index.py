@@ -0,0 +1,26 @@
+"""Add covering index for student attendance history
+
+Revision ID: 3f9a1c2e7b4d
+Revises: 6c2f70fbd700
+Create Date: 2026-10-19 18:05:12.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2e7b4d'
+down_revision = '6c2f70fbd700'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_student_timestamp', ['student_id', 'timestamp', 'id', 'session_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_student_timestamp')
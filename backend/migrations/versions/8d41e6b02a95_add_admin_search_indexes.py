@@ -0,0 +1,59 @@
+"""Add indexes for admin search and filtering
+
+Revision ID: 8d41e6b02a95
+Revises: 3f9a1c2e7b4d
+Create Date: 2026-10-19 18:42:37.905114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41e6b02a95'
+down_revision = '3f9a1c2e7b4d'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_users_email_trgm', 'users', 'email'),
+    ('ix_sessions_name_trgm', 'sessions', 'name'),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role', ['role'], unique=False)
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.create_index('ix_sessions_instructor_created', ['instructor_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_sessions_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_session_timestamp', ['session_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_attendance_timestamp', ['timestamp'], unique=False)
+
+    # Substring/prefix search on PostgreSQL
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(name, table, [column], unique=False,
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, table, _ in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name=table)
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_timestamp')
+        batch_op.drop_index('ix_attendance_session_timestamp')
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_sessions_created_at')
+        batch_op.drop_index('ix_sessions_instructor_created')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role')
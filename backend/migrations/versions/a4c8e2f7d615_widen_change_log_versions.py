@@ -0,0 +1,42 @@
+"""Widen change log versions to bigint
+
+Revision ID: a4c8e2f7d615
+Revises: f2b8d4c6a913
+Create Date: 2026-10-20 14:12:48.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f7d615'
+down_revision = 'f2b8d4c6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Uncommitted PostgreSQL rows carry provisional ids built from transaction
+    # ids; SQLite keeps its INTEGER PRIMARY KEY so AUTOINCREMENT still applies
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('change_log', 'id', type_=sa.BigInteger(), existing_type=sa.Integer())
+        op.alter_column('change_log_floor', 'version', type_=sa.BigInteger(), existing_type=sa.Integer(),
+                        existing_nullable=False)
+        op.execute("ALTER SEQUENCE change_log_id_seq AS bigint")
+        # Versions handed out from now on must be above every existing one,
+        # including those compaction already removed
+        op.execute("SELECT setval('change_log_id_seq', GREATEST((SELECT max(id) FROM change_log), "
+                   "(SELECT max(version) FROM change_log_floor), 1))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Versions past the integer range cannot be kept
+        op.execute('DELETE FROM change_log WHERE id > 2147483647')
+        op.execute('UPDATE change_log_floor SET version = 2147483647 WHERE version > 2147483647')
+        op.alter_column('change_log_floor', 'version', type_=sa.Integer(), existing_type=sa.BigInteger(),
+                        existing_nullable=False)
+        op.alter_column('change_log', 'id', type_=sa.Integer(), existing_type=sa.BigInteger())
+        op.execute("SELECT setval('change_log_id_seq', LEAST((SELECT last_value FROM change_log_id_seq), 2147483647))")
+        op.execute("ALTER SEQUENCE change_log_id_seq AS integer")
@@ -0,0 +1,116 @@
+"""Add institutions and scope users, sessions and attendance to them
+
+Revision ID: b7c3d9e1f204
+Revises: 8d41e6b02a95
+Create Date: 2026-10-19 19:20:48.311562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c3d9e1f204'
+down_revision = '8d41e6b02a95'
+branch_labels = None
+depends_on = None
+
+# Lets batch mode on SQLite name the constraints the initial migration left unnamed
+NAMING_CONVENTION = {
+    "uq": "uq_%(table_name)s_%(column_0_name)s",
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+
+def _old_names():
+    """Names of the original single-column constraints on this database."""
+    if op.get_bind().dialect.name == 'postgresql':
+        return {
+            'users_username': 'users_username_key',
+            'users_email': 'users_email_key',
+            'sessions_session_id': 'sessions_session_id_key',
+            'attendance_session_fk': 'attendance_session_id_fkey',
+        }
+    return {
+        'users_username': 'uq_users_username',
+        'users_email': 'uq_users_email',
+        'sessions_session_id': 'uq_sessions_session_id',
+        'attendance_session_fk': 'fk_attendance_session_id_sessions',
+    }
+
+
+def upgrade():
+    names = _old_names()
+
+    institutions = op.create_table('institutions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    # Existing rows all belong to the default institution
+    op.bulk_insert(institutions, [{'code': 'default', 'name': 'Default Institution'}])
+
+    with op.batch_alter_table('attendance', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(names['attendance_session_fk'], type_='foreignkey')
+
+    with op.batch_alter_table('users', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False))
+        batch_op.drop_constraint(names['users_username'], type_='unique')
+        batch_op.drop_constraint(names['users_email'], type_='unique')
+        batch_op.create_unique_constraint('uq_users_institution_username', ['institution_id', 'username'])
+        batch_op.create_unique_constraint('uq_users_institution_email', ['institution_id', 'email'])
+        batch_op.create_foreign_key('fk_users_institution_id', 'institutions', ['institution_id'], ['code'])
+
+    with op.batch_alter_table('sessions', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False))
+        batch_op.drop_constraint(names['sessions_session_id'], type_='unique')
+        batch_op.create_unique_constraint('uq_sessions_institution_session_id', ['institution_id', 'session_id'])
+        batch_op.create_foreign_key('fk_sessions_institution_id', 'institutions', ['institution_id'], ['code'])
+
+    with op.batch_alter_table('attendance', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.add_column(sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False))
+        batch_op.create_foreign_key('fk_attendance_institution_id', 'institutions', ['institution_id'], ['code'])
+        batch_op.create_foreign_key('fk_attendance_institution_session', 'sessions',
+                                    ['institution_id', 'session_id'], ['institution_id', 'session_id'])
+        # The history index also carries institution_id so tenant-scoped reads stay index-only
+        batch_op.drop_index('ix_attendance_student_timestamp')
+        batch_op.create_index('ix_attendance_student_timestamp',
+                              ['student_id', 'timestamp', 'id', 'session_id', 'institution_id'], unique=False)
+        batch_op.drop_index('ix_attendance_session_timestamp')
+        batch_op.create_index('ix_attendance_session_timestamp',
+                              ['institution_id', 'session_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    names = _old_names()
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_session_timestamp')
+        batch_op.create_index('ix_attendance_session_timestamp', ['session_id', 'timestamp'], unique=False)
+        batch_op.drop_index('ix_attendance_student_timestamp')
+        batch_op.create_index('ix_attendance_student_timestamp',
+                              ['student_id', 'timestamp', 'id', 'session_id'], unique=False)
+        batch_op.drop_constraint('fk_attendance_institution_session', type_='foreignkey')
+        batch_op.drop_constraint('fk_attendance_institution_id', type_='foreignkey')
+        batch_op.drop_column('institution_id')
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_sessions_institution_id', type_='foreignkey')
+        batch_op.drop_constraint('uq_sessions_institution_session_id', type_='unique')
+        batch_op.create_unique_constraint(names['sessions_session_id'], ['session_id'])
+        batch_op.drop_column('institution_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_users_institution_id', type_='foreignkey')
+        batch_op.drop_constraint('uq_users_institution_email', type_='unique')
+        batch_op.drop_constraint('uq_users_institution_username', type_='unique')
+        batch_op.create_unique_constraint(names['users_email'], ['email'])
+        batch_op.create_unique_constraint(names['users_username'], ['username'])
+        batch_op.drop_column('institution_id')
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_foreign_key(names['attendance_session_fk'], 'sessions', ['session_id'], ['session_id'])
+
+    op.drop_table('institutions')
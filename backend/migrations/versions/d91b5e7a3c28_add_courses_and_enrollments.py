@@ -0,0 +1,75 @@
+"""Add courses and enrollments, link sessions to courses, index check-in probes
+
+Revision ID: d91b5e7a3c28
+Revises: c4e8a2f61d37
+Create Date: 2026-10-19 21:36:52.104417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b5e7a3c28'
+down_revision = 'c4e8a2f61d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('courses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('instructor_id', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False),
+    sa.ForeignKeyConstraint(['institution_id'], ['institutions.code'], ),
+    sa.ForeignKeyConstraint(['instructor_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('institution_id', 'code', name='uq_courses_institution_code')
+    )
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.create_index('ix_courses_instructor', ['instructor_id'], unique=False)
+
+    op.create_table('course_enrollments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.String(length=50), nullable=False),
+    sa.Column('enrolled_at', sa.DateTime(), nullable=True),
+    sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['institution_id'], ['institutions.code'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('course_id', 'student_id', name='uq_course_enrollments_course_student')
+    )
+    with op.batch_alter_table('course_enrollments', schema=None) as batch_op:
+        batch_op.create_index('ix_course_enrollments_student', ['student_id'], unique=False)
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('course_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_sessions_course_id', 'courses', ['course_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_sessions_course_created', ['course_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_session_student', ['institution_id', 'session_id', 'student_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_session_student')
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_sessions_course_created')
+        batch_op.drop_constraint('fk_sessions_course_id', type_='foreignkey')
+        batch_op.drop_column('course_id')
+
+    with op.batch_alter_table('course_enrollments', schema=None) as batch_op:
+        batch_op.drop_index('ix_course_enrollments_student')
+
+    op.drop_table('course_enrollments')
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_index('ix_courses_instructor')
+
+    op.drop_table('courses')
@@ -0,0 +1,55 @@
+"""Add change log for incremental sync
+
+Revision ID: e5a7c3b19f42
+Revises: d91b5e7a3c28
+Create Date: 2026-10-19 23:12:48.301577
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c3b19f42'
+down_revision = 'd91b5e7a3c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_key', sa.String(length=50), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('owner_id', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False),
+    sa.ForeignKeyConstraint(['institution_id'], ['institutions.code'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_institution_version', ['institution_id', 'id'], unique=False)
+        batch_op.create_index('ix_change_log_owner_version', ['institution_id', 'owner_id', 'id'], unique=False)
+        batch_op.create_index('ix_change_log_entity_key', ['entity', 'entity_key', 'id'], unique=False)
+
+    op.create_table('change_log_floor',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('institution_id', sa.String(length=20), server_default='default', nullable=False),
+    sa.ForeignKeyConstraint(['institution_id'], ['institutions.code'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('institution_id', name='uq_change_log_floor_institution')
+    )
+
+
+def downgrade():
+    op.drop_table('change_log_floor')
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_entity_key')
+        batch_op.drop_index('ix_change_log_owner_version')
+        batch_op.drop_index('ix_change_log_institution_version')
+
+    op.drop_table('change_log')
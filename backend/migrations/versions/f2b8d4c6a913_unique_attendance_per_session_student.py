@@ -0,0 +1,49 @@
+"""Make check-ins unique per session and student
+
+Revision ID: f2b8d4c6a913
+Revises: e5a7c3b19f42
+Create Date: 2026-10-20 10:05:31.447210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4c6a913'
+down_revision = 'e5a7c3b19f42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the first of any duplicate check-ins so the unique index can be built
+    duplicates = (
+        "SELECT id FROM attendance WHERE id NOT IN ("
+        "SELECT MIN(id) FROM attendance GROUP BY institution_id, session_id, student_id)"
+    )
+    # Tombstones (as the change log hooks write them) so clients that synced
+    # the duplicates drop them too
+    if op.get_bind().dialect.name == 'postgresql':
+        json_object, now = "json_build_object", "(CURRENT_TIMESTAMP AT TIME ZONE 'UTC')"
+    else:
+        json_object, now = "json_object", "CURRENT_TIMESTAMP"
+    op.execute(
+        "INSERT INTO change_log (institution_id, entity, entity_key, op, data, owner_id, created_at) "
+        "SELECT a.institution_id, 'attendance', CAST(a.id AS VARCHAR(50)), 'delete', "
+        f"{json_object}('id', a.id, 'student_id', a.student_id, 'session_id', a.session_id), "
+        f"s.instructor_id, {now} "
+        "FROM attendance a LEFT JOIN sessions s "
+        "ON s.institution_id = a.institution_id AND s.session_id = a.session_id "
+        f"WHERE a.id IN ({duplicates}) ORDER BY a.id"
+    )
+    op.execute(f"DELETE FROM attendance WHERE id IN ({duplicates})")
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_session_student')
+        batch_op.create_index('uq_attendance_session_student', ['institution_id', 'session_id', 'student_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('uq_attendance_session_student')
+        batch_op.create_index('ix_attendance_session_student', ['institution_id', 'session_id', 'student_id'], unique=False)
@@ -1,7 +1,12 @@
 from extensions.extensions import db
+from extensions.routing import RoutingSession
+from extensions.tenancy import DEFAULT_INSTITUTION, current_institution, current_tenant
+from sqlalchemy import DDL, BigInteger, Text, bindparam, cast, event, func, select, text
+from sqlalchemy.orm import with_loader_criteria
 from enum import Enum
 from datetime import datetime
 import random
+import weakref
 
 
 class UserRole(Enum):
@@ -15,12 +20,77 @@ class UserRole(Enum):
         return role in cls._value2member_map_
 
 
-class User(db.Model):
+# Trigram indexes for admin search need pg_trgm on PostgreSQL
+event.listen(
+    db.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def trigram_index(name, column):
+    """GIN trigram index serving ILIKE substring/prefix search (PostgreSQL only)."""
+    return db.Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+
+
+class Institution(db.Model):
+    __tablename__ = "institutions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), unique=True, nullable=False)  # Tenant key used in JWTs and shard routing
+    name = db.Column(db.String(100), nullable=False)
+
+    def __repr__(self):
+        return f"<Institution {self.name}, Code: {self.code}>"
+
+
+# Every database starts with the default institution so pre-tenancy data has a home
+event.listen(
+    Institution.__table__,
+    "after_create",
+    DDL(f"INSERT INTO institutions (code, name) VALUES ('{DEFAULT_INSTITUTION}', 'Default Institution')"),
+)
+
+
+class TenantMixin:
+    """Adds ``institution_id`` and scopes every ORM query to the request's tenant."""
+
+    institution_id = db.Column(
+        db.String(20), db.ForeignKey("institutions.code"), nullable=False,
+        default=current_institution, server_default=DEFAULT_INSTITUTION
+    )
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _scope_to_tenant(orm_execute_state):
+    """Add ``institution_id = <tenant>`` to SELECT/UPDATE/DELETE on tenant models."""
+    tenant = current_tenant()
+    if tenant is None or orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return
+    if orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(
+                TenantMixin, lambda cls: cls.institution_id == tenant, include_aliases=True
+            )
+        )
+
+
+class User(TenantMixin, db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # Usernames and emails are unique within an institution
+        db.UniqueConstraint("institution_id", "username", name="uq_users_institution_username"),
+        db.UniqueConstraint("institution_id", "email", name="uq_users_institution_email"),
+        db.Index("ix_users_role", "role"),
+        trigram_index("ix_users_username_trgm", "username"),
+        trigram_index("ix_users_email_trgm", "email"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(100), unique=True, nullable=False)
-    email = db.Column(db.String(100), unique=True, nullable=False)
+    username = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), nullable=False)
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(50), nullable=False)
     user_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -33,13 +103,56 @@ class User(db.Model):
         return f"<User {self.username}, Role: {self.role}, User ID: {self.user_id}>"
 
 
-class Session(db.Model):
+class Course(TenantMixin, db.Model):
+    """An instructor's course; its enrollments are the roster for its sessions."""
+    __tablename__ = "courses"
+    __table_args__ = (
+        db.UniqueConstraint("institution_id", "code", name="uq_courses_institution_code"),
+        db.Index("ix_courses_instructor", "instructor_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), nullable=False)  # e.g. "CS201", unique per institution
+    name = db.Column(db.String(100), nullable=False)
+    instructor_id = db.Column(db.String(50), db.ForeignKey("users.user_id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Course {self.code} {self.name}, Instructor: {self.instructor_id}>"
+
+
+class Enrollment(TenantMixin, db.Model):
+    __tablename__ = "course_enrollments"
+    __table_args__ = (
+        db.UniqueConstraint("course_id", "student_id", name="uq_course_enrollments_course_student"),
+        db.Index("ix_course_enrollments_student", "student_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    student_id = db.Column(db.String(50), db.ForeignKey("users.user_id"), nullable=False)
+    enrolled_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Enrollment Course: {self.course_id}, Student: {self.student_id}>"
+
+
+class Session(TenantMixin, db.Model):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # 5-digit codes are unique per institution, not globally
+        db.UniqueConstraint("institution_id", "session_id", name="uq_sessions_institution_session_id"),
+        db.Index("ix_sessions_instructor_created", "instructor_id", "created_at"),
+        db.Index("ix_sessions_created_at", "created_at"),
+        db.Index("ix_sessions_course_created", "course_id", "created_at"),
+        trigram_index("ix_sessions_name_trgm", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # Default primary key
-    session_id = db.Column(db.String(5), unique=True, nullable=False, default=None)  # 5-digit unique ID
+    session_id = db.Column(db.String(5), nullable=False, default=None)  # 5-digit ID, unique per institution
     name = db.Column(db.String(100), nullable=False)
     instructor_id = db.Column(db.String(50), db.ForeignKey("users.user_id"), nullable=False)  
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id", ondelete="SET NULL"))  # Optional; rosters come from the course
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -50,12 +163,12 @@ class Session(db.Model):
 
     @staticmethod
     def generate_unique_session_id():
-        """Generate a unique 5-digit session ID."""
+        """Generate a 5-digit session ID unique within the current institution."""
         while True:
             session_id = random.randint(10000, 99999)  # Generate random 5-digit number
             session_id_str = str(session_id)  # Convert to string
-            # Ensure the session_id is unique in the database
-            if not db.session.query(Session).filter_by(session_id=session_id_str).first():
+            # Ensure the session_id is unique for this institution (queries are tenant-scoped)
+            if not db.session.query(Session.id).filter_by(session_id=session_id_str).first():
                 return session_id_str  # Return as string
 
     def __init__(self, **kwargs):
@@ -64,13 +177,269 @@ class Session(db.Model):
         if not self.session_id:
             self.session_id = self.generate_unique_session_id()
 
-class Attendance(db.Model):
+class Attendance(TenantMixin, db.Model):
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ["institution_id", "session_id"],
+            ["sessions.institution_id", "sessions.session_id"],
+            name="fk_attendance_institution_session",
+        ),
+        # Covering index for a student's history: filter on student_id, walk
+        # timestamp/id in order and read session_id without touching the table
+        db.Index("ix_attendance_student_timestamp", "student_id", "timestamp", "id", "session_id", "institution_id"),
+        db.Index("ix_attendance_session_timestamp", "institution_id", "session_id", "timestamp"),
+        # One check-in per student and session, whichever worker writes it;
+        # also serves the course reports' "did this student check in?" probes
+        db.Index("uq_attendance_session_student", "institution_id", "session_id", "student_id", unique=True),
+        db.Index("ix_attendance_timestamp", "timestamp"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.String(50), db.ForeignKey("users.user_id"), nullable=False)  
-    session_id = db.Column(db.String(5), db.ForeignKey("sessions.session_id"), nullable=False)  
+    session_id = db.Column(db.String(5), nullable=False)  
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f"<Attendance Student: {self.student_id}, Session: {self.session_id}, Time: {self.timestamp}>"
\ No newline at end of file
+        return f"<Attendance Student: {self.student_id}, Session: {self.session_id}, Time: {self.timestamp}>"
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(TenantMixin, db.Model):
+    """Background job; the table doubles as the work queue (see jobs/runner.py)."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers look for the oldest runnable job
+        db.Index("ix_jobs_status_run_after", "status", "run_after", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=JobStatus.QUEUED.value)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    progress = db.Column(db.Integer, nullable=False, default=0)  # Percent complete
+    result = db.Column(db.JSON)
+    result_location = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    submitted_by = db.Column(db.String(50), db.ForeignKey("users.user_id", ondelete="SET NULL"))
+    locked_by = db.Column(db.String(100))  # Worker currently running it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # Delays retries
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Stale heartbeats mean the worker died
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind}, Status: {self.status}, Progress: {self.progress}%>"
+
+
+class ChangeLog(TenantMixin, db.Model):
+    """Append-only feed of changes to attendance, sessions and users.
+
+    ``id`` is the version clients sync from (``GET /api/changes?since=``).
+    Rows are written by the flush and bulk-delete hooks below, in the same
+    transaction as the change itself. On PostgreSQL versions are handed out
+    when the transaction commits (see ``_stamp_change_versions``).
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        db.Index("ix_change_log_institution_version", "institution_id", "id"),
+        # Instructors only see changes to their own sessions
+        db.Index("ix_change_log_owner_version", "institution_id", "owner_id", "id"),
+        # Compaction looks for newer entries for the same row
+        db.Index("ix_change_log_entity_key", "entity", "entity_key", "id"),
+        # Versions must never be reused after compaction deletes the newest rows
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # "attendance", "session" or "user"
+    entity_key = db.Column(db.String(50), nullable=False)  # Attendance/session id or user_id
+    op = db.Column(db.String(10), nullable=False)  # "upsert" or "delete" (a tombstone)
+    data = db.Column(db.JSON)  # Row snapshot; identifying fields only for tombstones
+    owner_id = db.Column(db.String(50))  # Instructor of the session, if any
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeLog {self.id} {self.op} {self.entity} {self.entity_key}>"
+
+
+class ChangeLogFloor(TenantMixin, db.Model):
+    """Highest version whose tombstones compaction may have dropped.
+
+    Clients syncing from an older version have to download everything again.
+    """
+    __tablename__ = "change_log_floor"
+    __table_args__ = (
+        db.UniqueConstraint("institution_id", name="uq_change_log_floor_institution"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def _format_time(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else None
+
+
+# model -> (entity, key column, snapshot columns, tombstone columns)
+CHANGE_TRACKED = {
+    Attendance: ("attendance", "id", ("id", "student_id", "session_id", "timestamp"),
+                 ("id", "student_id", "session_id")),
+    Session: ("session", "id", ("id", "session_id", "name", "instructor_id", "course_id", "created_at"),
+              ("id", "session_id", "instructor_id")),
+    # Never the password hash
+    User: ("user", "user_id", ("user_id", "username", "email", "role"), ("user_id", "role")),
+}
+
+# PostgreSQL rows are inserted with a provisional id of
+# -((xid << CHANGE_LOG_XID_SHIFT) + n) for the writer's n-th change: unique
+# across running writers and never served. _stamp_change_versions replaces it
+# with the real version when the transaction commits.
+CHANGE_LOG_XID_SHIFT = 20
+
+# First key of the per-institution advisory locks taken while stamping versions
+CHANGE_LOG_LOCK_NAMESPACE = 0x636C6F67
+
+# Attendance rows take their owner from the session; the others pass it in
+_insert_change = ChangeLog.__table__.insert().values(
+    owner_id=func.coalesce(
+        bindparam("owner"),
+        select(Session.__table__.c.instructor_id)
+        .where(Session.__table__.c.institution_id == bindparam("owner_institution"),
+               Session.__table__.c.session_id == bindparam("owner_session"))
+        .scalar_subquery(),
+    )
+)
+
+
+def _change_row(model, values, op):
+    """Parameters for one change log row from a row's column ``values``."""
+    entity, key, _, _ = CHANGE_TRACKED[model]
+    data = {name: _format_time(value) if isinstance(value, datetime) else value
+            for name, value in values.items() if name != "institution_id"}
+    return {
+        "institution_id": values["institution_id"],
+        "entity": entity,
+        "entity_key": str(values[key]),
+        "op": op,
+        "data": data,
+        "owner": values.get("instructor_id"),
+        "owner_institution": values["institution_id"],
+        "owner_session": values.get("session_id") if model is Attendance else None,
+        "created_at": datetime.utcnow(),
+    }
+
+
+_insert_change_provisional = _insert_change.values(
+    id=-(cast(cast(func.pg_current_xact_id(), Text), BigInteger) * (1 << CHANGE_LOG_XID_SHIFT)
+         + bindparam("seq", type_=BigInteger))
+)
+
+# Volatile output columns are computed after the sort, so nextval follows the
+# order the changes were made in
+_stamp_versions = text("""
+    UPDATE change_log SET id = stamped.version
+    FROM (SELECT id, nextval(pg_get_serial_sequence('change_log', 'id')) AS version
+          FROM change_log WHERE id < 0 ORDER BY id DESC) AS stamped
+    WHERE change_log.id = stamped.id
+""")
+
+
+def _write_changes(session, rows):
+    connection = session.connection()
+    if connection.dialect.name != "postgresql":
+        # SQLite holds its write lock from the first write until commit, so
+        # versions from the sequence are committed in order
+        connection.execute(_insert_change, rows)
+        return
+    # Concurrent writers commit in any order, so a sequence value taken now
+    # could commit after a higher one and a client polling in between would
+    # skip it. Rows get a provisional id here and their version at commit.
+    transaction = session.get_transaction()
+    owner, used, institutions = session.info.get("change_log_pending", (None, 0, ()))
+    if owner is None or owner() is not transaction:
+        used, institutions = 0, ()
+    if used + len(rows) > 1 << CHANGE_LOG_XID_SHIFT:
+        raise ValueError("Too many changes in one transaction for the change log")
+    for seq, row in enumerate(rows, start=used):
+        row["seq"] = seq
+    institutions = set(institutions) | {row["institution_id"] for row in rows}
+    # A weak reference: the transaction refers back to the session
+    session.info["change_log_pending"] = (weakref.ref(transaction), used + len(rows), institutions)
+    connection.execute(_insert_change_provisional, rows)
+
+
+@event.listens_for(RoutingSession, "before_commit")
+def _stamp_change_versions(session):
+    """Give the transaction's change log rows their versions, in commit order.
+
+    The advisory lock of each institution written to is held from here until
+    the commit finishes, so within an institution versions are handed out in
+    the order the transactions commit. Only the commit itself is serialized;
+    writers run in parallel up to that point, and institutions never wait on
+    each other.
+    """
+    if session.in_nested_transaction():
+        return
+    # Changes flushed by the commit itself are logged before the versions
+    session.flush()
+    owner, _, institutions = session.info.pop("change_log_pending", (None, 0, ()))
+    if owner is None or owner() is not session.get_transaction():
+        return
+    connection = session.connection()
+    for institution in sorted(institutions):
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:institution))"),
+            {"namespace": CHANGE_LOG_LOCK_NAMESPACE, "institution": institution},
+        )
+    connection.execute(_stamp_versions)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _log_flushed_changes(session, flush_context):
+    """Log inserted, updated and deleted tracked objects with the flush."""
+    rows = []
+    for objects, op in ((session.new, "upsert"), (session.dirty, "upsert"), (session.deleted, "delete")):
+        for obj in objects:
+            model = type(obj)
+            if model not in CHANGE_TRACKED:
+                continue
+            if objects is session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            columns = CHANGE_TRACKED[model][2 if op == "upsert" else 3]
+            values = {name: getattr(obj, name) for name in columns + ("institution_id",)}
+            rows.append(_change_row(model, values, op))
+    if rows:
+        _write_changes(session, rows)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _log_bulk_deletes(orm_execute_state):
+    """Write tombstones for ``Query.delete()`` / ``delete(Model)`` statements.
+
+    The matching rows are read first, in the same transaction. Bulk INSERT
+    and UPDATE statements are not logged; only the seed scripts use them.
+    """
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    if model not in CHANGE_TRACKED:
+        return
+    columns = CHANGE_TRACKED[model][3] + ("institution_id",)
+    statement = orm_execute_state.statement
+    query = select(*(getattr(model, name) for name in columns))
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+    session = orm_execute_state.session
+    rows = [_change_row(model, row._asdict(), "delete") for row in session.execute(query)]
+    if rows:
+        _write_changes(session, rows)
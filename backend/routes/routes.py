@@ -1,21 +1,39 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, make_response, current_app
+from sqlalchemy import func, and_, or_, exists
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from flask_cors import CORS
-from io import BytesIO
-import qrcode
+from io import BytesIO, StringIO
+import csv
 import uuid
 import os
 from extensions.extensions import db
-from models.models import User, UserRole, Attendance, Session
+from extensions.routing import read_only
+from extensions.tenancy import DEFAULT_INSTITUTION, set_tenant, current_institution
+from extensions.checkin_cache import checkin_cache, UNKNOWN, VALID, INVALID
+from extensions.qr_sheets import attendance_url, build_sheet, render_png
+from extensions.profiling import profile_store
+from models.models import User, UserRole, Attendance, Session, Institution, Job, JobStatus, Course, Enrollment, ChangeLog, ChangeLogFloor
+from jobs.runner import HANDLERS, submit
 from datetime import datetime, timedelta
 
 # Define Blueprint
 routes_bp = Blueprint("routes", __name__)
 CORS(routes_bp)
 
-# Define API Base URL
-API_BASE_URL = os.getenv("API_BASE_URL", "https://classattendanceqrcodesystem.onrender.com")
+def _checked_in(student_id, session_id):
+    """True if the student already has a check-in for this session."""
+    return db.session.query(Attendance.id).filter_by(
+        student_id=student_id, session_id=session_id
+    ).first() is not None
+
+def _attendance_session_join():
+    """Join condition from Attendance to its Session (codes are unique per institution)."""
+    return and_(
+        Session.institution_id == Attendance.institution_id,
+        Session.session_id == Attendance.session_id
+    )
 
 @routes_bp.route("/", methods=["GET"])
 def home():
@@ -24,6 +42,18 @@ def home():
 
 ### AUTH ROUTES ###
 
+def _use_requested_institution(data):
+    """Scope this request to the institution named in the payload.
+
+    Returns the institution code, or None if it does not exist. Clients that
+    predate tenancy omit the field and get the default institution.
+    """
+    code = (data.get('institution') or DEFAULT_INSTITUTION).strip().lower()
+    set_tenant(code)
+    if not Institution.query.filter_by(code=code).first():
+        return None
+    return code
+
 # Register Route
 @routes_bp.route('/api/register', methods=['POST'])
 def register():
@@ -39,6 +69,11 @@ def register():
         if role not in ['student', 'instructor', 'admin']:
             return jsonify({"error": "Invalid role."}), 400
 
+        # Users belong to one institution (tenant)
+        institution = _use_requested_institution(data)
+        if not institution:
+            return jsonify({"error": "Unknown institution."}), 400
+
         # Generate user ID
         prefix = {'student': 'stu', 'instructor': 'ins', 'admin': 'adm'}.get(role, 'usr')
         user_id = f"{prefix}_{uuid.uuid4().hex[:5]}"
@@ -52,7 +87,8 @@ def register():
             email=data['email'],
             password=hashed_password,
             role=role,
-            user_id=user_id
+            user_id=user_id,
+            institution_id=institution
         )
 
         db.session.add(new_user)
@@ -73,14 +109,19 @@ def login():
         if not data.get('email') or not data.get('password'):
             return jsonify({"error": "Email and password are required."}), 400
 
+        # Emails are unique per institution, so look the user up in the requested one
+        institution = _use_requested_institution(data)
+        if not institution:
+            return jsonify({"error": "Unknown institution."}), 400
+
         user = User.query.filter_by(email=data['email']).first()
         if not user or not check_password_hash(user.password, data['password']):
             return jsonify({"error": "Confirm credentials or register if you haven't."}), 401
 
-        # Create JWT token with user_id and role as claims
+        # Create JWT token with user_id, role and institution as claims
         access_token = create_access_token(
             identity=user.user_id,  # Storing user_id as identity in the token
-            additional_claims={"role": user.role},  # Adding role as additional claim
+            additional_claims={"role": user.role, "institution": user.institution_id},  # Institution scopes every later request
             expires_delta=timedelta(hours=1)
         )
 
@@ -89,7 +130,8 @@ def login():
             "message": "Login successful",
             "token": access_token,
             "user_id": user.user_id,  # Include user_id in the response
-            "role": user.role  # Include user role
+            "role": user.role,  # Include user role
+            "institution": user.institution_id
         }), 200
 
     except Exception as e:
@@ -117,13 +159,29 @@ def create_session():
         if not name:
             return jsonify({"error": "Session name is required"}), 400
 
+        # Optionally attach it to one of the instructor's courses (its roster)
+        course_id = data.get("course_id")
+        if course_id is not None:
+            try:
+                course_id = int(course_id)
+            except (TypeError, ValueError):
+                return jsonify({"error": "course_id must be an integer."}), 400
+            course = Course.query.filter_by(id=course_id, instructor_id=user.user_id).first()
+            if not course:
+                return jsonify({"error": "Course not found"}), 404
+
         # Create a new session with the instructor's user_id and the session name
-        new_session = Session(name=name, instructor_id=user.user_id)
+        new_session = Session(name=name, instructor_id=user.user_id, course_id=course_id)
         
         # Add and commit the new session to the database
         db.session.add(new_session)
         db.session.commit()
 
+        # Scans of the new code can be validated from memory straight away
+        cache = checkin_cache()
+        if cache:
+            cache.add_session(new_session.institution_id, new_session.session_id)
+
         # Retrieve the session again to include `created_at` and `session_id` (5-digit code)
         created_session = Session.query.filter_by(id=new_session.id).first()
 
@@ -133,6 +191,7 @@ def create_session():
             "session_id": created_session.session_id,  # Return the 5-digit session ID
             "name": created_session.name,
             "instructor_id": created_session.instructor_id,
+            "course_id": created_session.course_id,
             "created_at": created_session.created_at.strftime("%Y-%m-%d %H:%M:%S")  # Convert to readable format
         }), 201
 
@@ -143,6 +202,7 @@ def create_session():
 
 @routes_bp.route("/api/sessions", methods=["GET"])
 @jwt_required()
+@read_only
 def get_sessions():
     try:
         # Get the current user ID from the JWT token
@@ -164,6 +224,7 @@ def get_sessions():
             "session_id": s.session_id,  # Add this line to include session_id
             "name": s.name,
             "instructor_id": s.instructor_id,
+            "course_id": s.course_id,
             "created_at": s.created_at.strftime("%Y-%m-%d %H:%M:%S")  # Convert to readable format
         } for s in sessions]), 200
 
@@ -172,6 +233,320 @@ def get_sessions():
         return jsonify({"error": "An error occurred while retrieving sessions."}), 500
 
 
+### COURSE ROUTES ###
+
+def _managed_course(course_id):
+    """(user, course) if the caller is an admin or the course's instructor.
+
+    Returns ``(user, None)`` when the course is missing or not theirs.
+    """
+    user = User.query.filter_by(user_id=get_jwt_identity()).first()
+    if not user or user.role not in ('instructor', 'admin'):
+        return user, None
+    course = Course.query.filter_by(id=course_id).first()
+    if course and user.role == 'instructor' and course.instructor_id != user.user_id:
+        course = None
+    return user, course
+
+def _course_to_dict(course):
+    return {
+        "id": course.id,
+        "code": course.code,
+        "name": course.name,
+        "instructor_id": course.instructor_id,
+        "created_at": course.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+@routes_bp.route("/api/courses", methods=["POST"])
+@jwt_required()
+def create_course():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role != 'instructor':
+            return jsonify({"error": "Only instructors can create courses"}), 403
+
+        data = request.get_json() or {}
+        code = (data.get("code") or "").strip().upper()
+        name = (data.get("name") or "").strip()
+        if not code or not name:
+            return jsonify({"error": "Course code and name are required"}), 400
+        if Course.query.filter_by(code=code).first():
+            return jsonify({"error": "A course with this code already exists"}), 409
+
+        course = Course(code=code, name=name, instructor_id=user.user_id)
+        db.session.add(course)
+        db.session.commit()
+        return jsonify(_course_to_dict(course)), 201
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error creating course: {e}")
+        return jsonify({"error": "An error occurred while creating the course."}), 500
+
+@routes_bp.route("/api/courses", methods=["GET"])
+@jwt_required()
+@read_only
+def get_courses():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role not in ('instructor', 'admin'):
+            return jsonify({"error": "Only instructors and admins can view courses"}), 403
+
+        # Roster and session counts in the same query
+        students = (
+            db.session.query(func.count(Enrollment.id))
+            .filter(Enrollment.course_id == Course.id)
+            .correlate(Course).scalar_subquery()
+        )
+        sessions = (
+            db.session.query(func.count(Session.id))
+            .filter(Session.course_id == Course.id)
+            .correlate(Course).scalar_subquery()
+        )
+        query = db.session.query(Course, students, sessions)
+        if user.role == 'instructor':
+            query = query.filter(Course.instructor_id == user.user_id)
+        elif request.args.get("instructor_id"):
+            query = query.filter(Course.instructor_id == request.args["instructor_id"])
+
+        return jsonify([
+            dict(_course_to_dict(course), students=student_count, sessions=session_count)
+            for course, student_count, session_count in query.order_by(Course.code).all()
+        ]), 200
+
+    except Exception as e:
+        print(f"Error fetching courses: {e}")
+        return jsonify({"error": "An error occurred while fetching courses."}), 500
+
+@routes_bp.route("/api/courses/<int:course_id>/students", methods=["GET"])
+@jwt_required()
+@read_only
+def get_course_students(course_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        roster = (
+            db.session.query(User.user_id, User.username, User.email, Enrollment.enrolled_at)
+            .join(Enrollment, Enrollment.student_id == User.user_id)
+            .filter(Enrollment.course_id == course.id)
+            .order_by(User.username)
+            .all()
+        )
+        return jsonify([{
+            "student_id": r.user_id,
+            "username": r.username,
+            "email": r.email,
+            "enrolled_at": r.enrolled_at.strftime("%Y-%m-%d %H:%M:%S")
+        } for r in roster]), 200
+
+    except Exception as e:
+        print(f"Error fetching roster: {e}")
+        return jsonify({"error": "An error occurred while fetching the roster."}), 500
+
+@routes_bp.route("/api/courses/<int:course_id>/students", methods=["POST"])
+@jwt_required()
+def enroll_students(course_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        # Body: {"student_ids": ["stu_...", ...]}; already enrolled ids are skipped
+        data = request.get_json() or {}
+        student_ids = list(dict.fromkeys(str(s) for s in data.get("student_ids") or []))
+        if not student_ids:
+            return jsonify({"error": "student_ids is required"}), 400
+
+        students = {
+            sid for (sid,) in db.session.query(User.user_id)
+            .filter(User.user_id.in_(student_ids), User.role == 'student')
+        }
+        enrolled = {
+            sid for (sid,) in db.session.query(Enrollment.student_id)
+            .filter(Enrollment.course_id == course.id, Enrollment.student_id.in_(student_ids))
+        }
+        new_ids = [sid for sid in student_ids if sid in students and sid not in enrolled]
+        db.session.add_all([Enrollment(course_id=course.id, student_id=sid) for sid in new_ids])
+        db.session.commit()
+
+        return jsonify({
+            "enrolled": len(new_ids),
+            "already_enrolled": len(enrolled),
+            "unknown_students": [sid for sid in student_ids if sid not in students]
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error enrolling students: {e}")
+        return jsonify({"error": "An error occurred while enrolling students."}), 500
+
+@routes_bp.route("/api/courses/<int:course_id>/students/<string:student_id>", methods=["DELETE"])
+@jwt_required()
+def unenroll_student(course_id, student_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        deleted = Enrollment.query.filter_by(course_id=course.id, student_id=student_id).delete()
+        db.session.commit()
+        if not deleted:
+            return jsonify({"error": "Student is not enrolled"}), 404
+        return jsonify({"message": "Student removed from course"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error removing student: {e}")
+        return jsonify({"error": "An error occurred while removing the student."}), 500
+
+def _attended_course_session():
+    """Attendance row for the enrolled student at the session (for EXISTS / outer joins)."""
+    return and_(_attendance_session_join(), Attendance.student_id == Enrollment.student_id)
+
+# Enrolled students who did not check in, per session (Instructor or Admin)
+@routes_bp.route("/api/courses/<int:course_id>/absentees", methods=["GET"])
+@jwt_required()
+@read_only
+def get_course_absentees(course_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        # One anti-join: roster x course sessions WHERE NOT EXISTS a check-in.
+        # Optional ?session_id=<code> narrows it to one session.
+        query = (
+            db.session.query(Session.session_id, Session.name, Enrollment.student_id, User.username)
+            .select_from(Enrollment)
+            .join(Session, Session.course_id == Enrollment.course_id)
+            .join(User, User.user_id == Enrollment.student_id)
+            .filter(Enrollment.course_id == course.id)
+            .filter(~exists().where(_attended_course_session()))
+        )
+        if request.args.get("session_id"):
+            query = query.filter(Session.session_id == request.args["session_id"])
+
+        rows = _apply_paging(query.order_by(Session.created_at, Session.id, User.username)).all()
+        return jsonify([{
+            "session_id": r.session_id,
+            "session_name": r.name,
+            "student_id": r.student_id,
+            "username": r.username
+        } for r in rows]), 200
+
+    except Exception as e:
+        print(f"Error fetching absentees: {e}")
+        return jsonify({"error": "An error occurred while fetching absentees."}), 500
+
+# Attendance percentage per enrolled student (Instructor or Admin)
+@routes_bp.route("/api/courses/<int:course_id>/attendance-summary", methods=["GET"])
+@jwt_required()
+@read_only
+def get_course_attendance_summary(course_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        # One aggregate: roster x course sessions, left-joined to check-ins
+        # (one index probe per pair), grouped per student. Sessions are
+        # outer-joined so a course without any still lists its roster at 0/0.
+        total = (
+            db.session.query(func.count(Session.id))
+            .filter(Session.course_id == course.id)
+            .scalar_subquery()
+        )
+        attended = func.count(func.distinct(Attendance.session_id))
+        percentage = func.coalesce(100.0 * attended / func.nullif(total, 0), 0.0)
+        query = (
+            db.session.query(Enrollment.student_id, User.username, attended.label("attended"),
+                             total.label("total"), percentage.label("percentage"))
+            .select_from(Enrollment)
+            .join(User, User.user_id == Enrollment.student_id)
+            .outerjoin(Session, Session.course_id == Enrollment.course_id)
+            .outerjoin(Attendance, _attended_course_session())
+            .filter(Enrollment.course_id == course.id)
+            .group_by(Enrollment.student_id, User.username)
+        )
+        # ?below=75 lists only students under that percentage
+        below = request.args.get("below", type=float)
+        if below is not None:
+            query = query.having(percentage < below)
+
+        rows = query.order_by(percentage, User.username).all()
+        return jsonify({
+            "course": _course_to_dict(course),
+            "sessions": rows[0].total if rows else None,
+            "students": [{
+                "student_id": r.student_id,
+                "username": r.username,
+                "attended": r.attended,
+                "percentage": round(float(r.percentage), 1)
+            } for r in rows]
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching attendance summary: {e}")
+        return jsonify({"error": "An error occurred while fetching the attendance summary."}), 500
+
+# Students x sessions attendance grid as CSV or JSON (Instructor or Admin)
+@routes_bp.route("/api/courses/<int:course_id>/matrix", methods=["GET"])
+@jwt_required()
+@read_only
+def get_course_matrix(course_id):
+    try:
+        user, course = _managed_course(course_id)
+        if not course:
+            return jsonify({"error": "Course not found"}), 404
+
+        # One query: roster x sessions with an EXISTS probe per cell, ordered
+        # so each student's cells arrive together and in session order.
+        # Sessions are outer-joined so a course without any still lists its
+        # roster (one row per student with no session).
+        rows = (
+            db.session.query(Enrollment.student_id, User.username, Session.session_id, Session.name,
+                             exists().where(_attended_course_session()).label("attended"))
+            .select_from(Enrollment)
+            .join(User, User.user_id == Enrollment.student_id)
+            .outerjoin(Session, Session.course_id == Enrollment.course_id)
+            .filter(Enrollment.course_id == course.id)
+            .order_by(User.username, Enrollment.student_id, Session.created_at, Session.id)
+            .all()
+        )
+
+        sessions, students = [], []
+        for row in rows:
+            if not students or students[-1]["student_id"] != row.student_id:
+                students.append({"student_id": row.student_id, "username": row.username, "attended": []})
+            if row.session_id is None:
+                continue
+            if len(students) == 1:
+                sessions.append({"session_id": row.session_id, "name": row.name})
+            students[-1]["attended"].append(bool(row.attended))
+
+        if request.args.get("format") == "json":
+            return jsonify({"course": _course_to_dict(course), "sessions": sessions, "students": students}), 200
+
+        out = StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["student_id", "username"] + [f"{s['name']} ({s['session_id']})" for s in sessions]
+                        + ["attended", "percentage"])
+        for student in students:
+            marks = student["attended"]
+            writer.writerow([student["student_id"], student["username"]] + [int(m) for m in marks]
+                            + [sum(marks), round(100.0 * sum(marks) / len(marks), 1) if marks else 0.0])
+        return send_file(BytesIO(out.getvalue().encode()), mimetype="text/csv", as_attachment=True,
+                         download_name=f"{course.code}_attendance.csv")
+
+    except Exception as e:
+        print(f"Error building attendance matrix: {e}")
+        return jsonify({"error": "An error occurred while building the attendance matrix."}), 500
+
+
 ### ATTENDANCE ROUTES ###
 
 @routes_bp.route("/api/attendance", methods=["POST"])
@@ -180,11 +555,6 @@ def mark_attendance():
     try:
         # Get the current user's ID from the JWT token
         current_user_id = get_jwt_identity()
-        user = User.query.filter_by(user_id=current_user_id).first()
-
-        # Ensure the user is a student
-        if not user or user.role != "student":
-            return jsonify({"error": "Only students can mark attendance"}), 403
 
         # Parse the session_id from the request
         data = request.get_json()
@@ -193,21 +563,61 @@ def mark_attendance():
         # Validate session_id
         if not session_id:
             return jsonify({"error": "Missing session_id"}), 400
+        session_id = str(session_id)
 
-        # Query the session using session_id
-        session = Session.query.filter_by(session_id=session_id).first()
-        if not session:
+        user = User.query.filter_by(user_id=current_user_id).first()
+
+        # Ensure the user is a student. Checked before any cached answer: the
+        # cache still knows a deleted user's check-ins until its entry expires
+        if not user or user.role != "student":
+            return jsonify({"error": "Only students can mark attendance"}), 403
+
+        # Repeat scans are answered from this worker's cache without looking
+        # up the check-in (only students who checked in are ever in it)
+        cache = checkin_cache()
+        institution = current_institution()
+        probed = False
+        seen = cache.has_seen(institution, session_id, user.user_id) if cache else False
+        if seen is None:
+            # A Bloom hit is only "maybe"; one indexed probe settles it
+            seen, probed = _checked_in(user.user_id, session_id), True
+        if seen:
+            return jsonify({"message": "Attendance already marked"}), 200
+
+        # Check the session code, from the cache when possible
+        state = cache.session_state(institution, session_id) if cache else UNKNOWN
+        from_cache = state != UNKNOWN
+        if state == UNKNOWN:
+            session_exists = db.session.query(Session.id).filter_by(session_id=session_id).first() is not None
+            if cache:
+                # Warm the seen set with everyone already checked in
+                seen = [row.student_id for row in db.session.query(Attendance.student_id).filter_by(
+                    session_id=session_id
+                )] if session_exists else []
+                cache.warm(institution, session_id, session_exists, seen)
+            state = VALID if session_exists else INVALID
+        if state == INVALID:
             return jsonify({"error": "Invalid session ID"}), 400
 
         # Log session and student info for debugging
         print(f"Student {user.user_id} marking attendance for session {session_id}")
 
-        # Check if attendance is already marked
-        existing_attendance = Attendance.query.filter_by(
-            student_id=user.user_id, session_id=session_id  # Use session_id directly
-        ).first()
-        if existing_attendance:
-            return jsonify({"message": "Attendance already marked"}), 200
+        # The session is cached now, so a seen-set miss is definite for this
+        # worker and goes straight to the insert. Only a Bloom hit ("maybe")
+        # or a disabled cache needs the database to say whether it's a repeat
+        if not probed:
+            seen = cache.has_seen(institution, session_id, user.user_id) if cache else None
+            if seen or (seen is None and _checked_in(user.user_id, session_id)):
+                if cache:
+                    cache.mark_seen(institution, session_id, user.user_id)
+                return jsonify({"message": "Attendance already marked"}), 200
+
+        # A cached "valid" can outlive a deleted session by up to
+        # CHECKIN_CACHE_TTL_SECONDS, and SQLite does not enforce the foreign
+        # key, so confirm the session before writing to it
+        if from_cache and db.session.query(Session.id).filter_by(session_id=session_id).first() is None:
+            cache.invalidate(institution, session_id)
+            return jsonify({"error": "Invalid session ID"}), 400
 
         # Mark attendance
         new_attendance = Attendance(
@@ -216,7 +626,21 @@ def mark_attendance():
             timestamp=datetime.utcnow()
         )
         db.session.add(new_attendance)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # uq_attendance_session_student: another worker checked the
+            # student in first. Otherwise the session was deleted meanwhile
+            db.session.rollback()
+            if not _checked_in(user.user_id, session_id):
+                if cache:
+                    cache.invalidate(institution, session_id)
+                return jsonify({"error": "Invalid session ID"}), 400
+            if cache:
+                cache.mark_seen(institution, session_id, user.user_id)
+            return jsonify({"message": "Attendance already marked"}), 200
+        if cache:
+            cache.mark_seen(institution, session_id, user.user_id)
 
         print(f"Attendance successfully marked for student {user.user_id} in session {session_id}")
 
@@ -228,6 +652,7 @@ def mark_attendance():
 
 @routes_bp.route("/api/attendance/<string:session_id>", methods=["GET"])
 @jwt_required()
+@read_only
 def view_attendance(session_id):  # session_id is now a string
     try:
         # Get the current user's ID from the JWT token
@@ -265,39 +690,217 @@ def view_attendance(session_id):  # session_id is now a string
         print(f"Error retrieving attendance: {e}")
         return jsonify({"error": "An error occurred while retrieving attendance records."}), 500
 
+### STUDENT ROUTES ###
+
+MY_ATTENDANCE_DEFAULT_LIMIT = 50
+MY_ATTENDANCE_MAX_LIMIT = 200
+
+
+def _parse_attendance_cursor(cursor):
+    """Split a ``<timestamp>,<id>`` cursor into its parts, or return None."""
+    try:
+        timestamp, record_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except (ValueError, AttributeError):
+        return None
+
+
+@routes_bp.route("/api/me/attendance", methods=["GET"])
+@jwt_required()
+@read_only
+def get_my_attendance():
+    try:
+        # Get the current user's ID from the JWT token
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+
+        # Ensure the user is a student
+        if not user or user.role != "student":
+            return jsonify({"error": "Only students can view their attendance history"}), 403
+
+        # Page size and optional cursor from the previous page
+        try:
+            limit = int(request.args.get("limit", MY_ATTENDANCE_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MY_ATTENDANCE_MAX_LIMIT))
+
+        cursor_arg = request.args.get("before")
+        cursor = None
+        if cursor_arg:
+            cursor = _parse_attendance_cursor(cursor_arg)
+            if not cursor:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        # Cheap fingerprint of the student's records (index-only) for the ETag;
+        # any insert or delete changes the count, newest timestamp or highest id
+        count, latest, max_id = db.session.query(
+            func.count(Attendance.id), func.max(Attendance.timestamp), func.max(Attendance.id)
+        ).filter(Attendance.student_id == user.user_id).one()
+        latest_stamp = latest.strftime("%Y%m%d%H%M%S%f") if latest else "0"
+        etag = f"{user.user_id}-{count}-{latest_stamp}-{max_id or 0}-{limit}-{cursor_arg or ''}"
+        if etag in request.if_none_match:
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+
+        # Newest first, walking the (student_id, timestamp) index
+        query = db.session.query(
+            Attendance.id,
+            Attendance.session_id,
+            Attendance.timestamp,
+            Session.name.label("session_name"),
+            Session.instructor_id,
+            User.username.label("instructor_name"),
+        ).join(
+            Session, _attendance_session_join()
+        ).join(
+            User, User.user_id == Session.instructor_id
+        ).filter(Attendance.student_id == user.user_id)
+
+        if cursor:
+            cursor_timestamp, cursor_id = cursor
+            query = query.filter(or_(
+                Attendance.timestamp < cursor_timestamp,
+                and_(Attendance.timestamp == cursor_timestamp, Attendance.id < cursor_id),
+            ))
+
+        rows = query.order_by(Attendance.timestamp.desc(), Attendance.id.desc()).limit(limit + 1).all()
+
+        # Fetching one extra row tells us whether there is another page
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last.timestamp.isoformat()},{last.id}"
+
+        response = jsonify({
+            "attendance": [
+                {
+                    "id": r.id,
+                    "session_id": r.session_id,
+                    "session_name": r.session_name,
+                    "instructor_id": r.instructor_id,
+                    "instructor_name": r.instructor_name,
+                    "timestamp": r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                }
+                for r in rows
+            ],
+            "next_cursor": next_cursor
+        })
+        response.set_etag(etag)
+        return response, 200
+
+    except Exception as e:
+        print(f"Error retrieving attendance history: {e}")
+        return jsonify({"error": "An error occurred while retrieving your attendance history."}), 500
+
 ### QR CODE ROUTES ###
 
 @routes_bp.route("/api/qr/<string:session_id>", methods=["GET"])  
 @jwt_required()
+@read_only
 def generate_qr(session_id):
     session = Session.query.filter_by(session_id=session_id).first()  # Query by session_id
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
-    qr_data = f"{API_BASE_URL}/api/attendance/mark/{session_id}"  # Use session_id in the URL
+    img_io = BytesIO(render_png(attendance_url(session_id)))  # Use session_id in the URL
+    return send_file(img_io, mimetype="image/png")
 
+# Printable QR codes for many sessions at once (Instructor or Admin)
+@routes_bp.route("/api/qr/sheet", methods=["POST"])
+@jwt_required()
+@read_only
+def generate_qr_sheet():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role not in ('instructor', 'admin'):
+            return jsonify({"error": "Only instructors and admins can print QR codes"}), 403
+
+        # Body: {"session_ids": [...]} or nothing for all of the instructor's
+        # sessions; admins may pass "instructor_id". "format" is "pdf" or "zip".
+        data = request.get_json(silent=True) or {}
+        fmt = data.get('format', 'pdf')
+        if fmt not in ('pdf', 'zip'):
+            return jsonify({"error": "format must be 'pdf' or 'zip'."}), 400
+
+        query = db.session.query(Session.session_id, Session.name)
+        if user.role == 'instructor':
+            query = query.filter(Session.instructor_id == current_user_id)
+        elif data.get('instructor_id'):
+            query = query.filter(Session.instructor_id == data['instructor_id'])
+        elif not data.get('session_ids'):
+            return jsonify({"error": "Give session_ids or instructor_id."}), 400
+        if data.get('session_ids'):
+            query = query.filter(Session.session_id.in_([str(s) for s in data['session_ids']]))
+
+        limit = current_app.config.get("QR_SHEET_MAX_SESSIONS", 1000)
+        sessions = query.order_by(Session.created_at).limit(limit + 1).all()
+        if not sessions:
+            return jsonify({"error": "No sessions found"}), 404
+        if len(sessions) > limit:
+            return jsonify({"error": f"At most {limit} sessions per sheet."}), 400
+
+        sheet, mimetype, filename = build_sheet(sessions, fmt)
+        return send_file(sheet, mimetype=mimetype, as_attachment=True, download_name=filename)
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
+    except Exception as e:
+        print(f"Error generating QR sheet: {e}")
+        return jsonify({"error": "An error occurred while generating QR codes."}), 500
 
-    img = qr.make_image(fill="black", back_color="white")
-    img_io = BytesIO()
-    img.save(img_io, format="PNG")
-    img_io.seek(0)
+ # ---------------------Admin Routes---------------------#
 
-    return send_file(img_io, mimetype="image/png")
+def _search_filter(columns, term):
+    """Case-insensitive substring (or ``match=prefix``) search over ``columns``.
+
+    ILIKE is served by the pg_trgm GIN indexes on PostgreSQL.
+    """
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if request.args.get("match") == "prefix":
+        pattern = f"{escaped}%"
+    else:
+        pattern = f"%{escaped}%"
+    return or_(*[column.ilike(pattern, escape="\\") for column in columns])
+
+
+def _parse_date_range():
+    """Read ``from``/``to`` (YYYY-MM-DD or ISO datetime) as a half-open range.
+
+    A date-only ``to`` includes that whole day. Raises ValueError on bad input.
+    """
+    bounds = []
+    for name in ("from", "to"):
+        value = request.args.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid '{name}' date, expected YYYY-MM-DD") from None
+        if name == "to" and len(value) == 10:
+            parsed += timedelta(days=1)
+        bounds.append(parsed)
+    return bounds[0], bounds[1]
+
+
+def _apply_paging(query):
+    """Apply optional ``limit``/``offset`` query parameters."""
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", type=int)
+    if limit is not None:
+        query = query.limit(max(limit, 0))
+    if offset:
+        query = query.offset(max(offset, 0))
+    return query
 
- # ---------------------Admin Routes---------------------#
 
 # Get all users (Admin only)
 @routes_bp.route('/api/users', methods=['GET'])
 @jwt_required()
+@read_only
 def get_users():
     try:
         # Check if the current user is an admin
@@ -306,8 +909,18 @@ def get_users():
         if not user or user.role != 'admin':
             return jsonify({"error": "Only admins can view users"}), 403
 
-        # Fetch and return all users
-        users = User.query.all()
+        # Optional filters: ?role=student&q=jane&match=prefix&limit=50&offset=0
+        query = User.query
+        role = request.args.get("role")
+        if role:
+            if not UserRole.is_valid(role):
+                return jsonify({"error": "Invalid role."}), 400
+            query = query.filter(User.role == role)
+        term = request.args.get("q", "").strip()
+        if term:
+            query = query.filter(_search_filter([User.username, User.email], term))
+
+        users = _apply_paging(query.order_by(User.id)).all()
         return jsonify([{
             "user_id": u.user_id,
             "username": u.username,
@@ -322,6 +935,7 @@ def get_users():
 # Get all attendance records (Admin only)
 @routes_bp.route("/api/attendance", methods=["GET"])
 @jwt_required()
+@read_only
 def get_all_attendance():
     try:
         # Check if the current user is an admin
@@ -330,8 +944,29 @@ def get_all_attendance():
         if not user or user.role != 'admin':
             return jsonify({"error": "Only admins can view attendance"}), 403
 
-        # Fetch and return all attendance records
-        attendance_records = Attendance.query.all()
+        # Optional filters: student_id, session_id, instructor_id, from/to dates
+        # and q (session name search)
+        query = db.session.query(
+            Attendance.id, Attendance.student_id, Attendance.session_id, Attendance.timestamp
+        )
+        if request.args.get("student_id"):
+            query = query.filter(Attendance.student_id == request.args["student_id"])
+        if request.args.get("session_id"):
+            query = query.filter(Attendance.session_id == request.args["session_id"])
+        start, end = _parse_date_range()
+        if start:
+            query = query.filter(Attendance.timestamp >= start)
+        if end:
+            query = query.filter(Attendance.timestamp < end)
+        term = request.args.get("q", "").strip()
+        if request.args.get("instructor_id") or term:
+            query = query.join(Session, _attendance_session_join())
+            if request.args.get("instructor_id"):
+                query = query.filter(Session.instructor_id == request.args["instructor_id"])
+            if term:
+                query = query.filter(_search_filter([Session.name], term))
+
+        attendance_records = _apply_paging(query.order_by(Attendance.id)).all()
         return jsonify([{
             "id": record.id,
             "student_id": record.student_id,
@@ -339,6 +974,8 @@ def get_all_attendance():
             "timestamp": record.timestamp.strftime("%Y-%m-%d %H:%M:%S")
         } for record in attendance_records]), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error fetching attendance: {e}")
         return jsonify({"error": "An error occurred while fetching attendance records."}), 500
@@ -346,6 +983,7 @@ def get_all_attendance():
 # Get all sessions (Admin only)
 @routes_bp.route("/api/sessions/all", methods=["GET"])
 @jwt_required()
+@read_only
 def get_all_sessions():
     try:
         # Check if the current user is an admin
@@ -354,8 +992,21 @@ def get_all_sessions():
         if not user or user.role != 'admin':
             return jsonify({"error": "Only admins can view all sessions"}), 403
 
-        # Fetch and return all sessions
-        sessions = Session.query.all()
+        # Optional filters: instructor_id, from/to dates and q (name search).
+        # Select columns only so the joined attendance relationship is not loaded
+        query = db.session.query(Session.id, Session.name, Session.instructor_id, Session.created_at)
+        if request.args.get("instructor_id"):
+            query = query.filter(Session.instructor_id == request.args["instructor_id"])
+        start, end = _parse_date_range()
+        if start:
+            query = query.filter(Session.created_at >= start)
+        if end:
+            query = query.filter(Session.created_at < end)
+        term = request.args.get("q", "").strip()
+        if term:
+            query = query.filter(_search_filter([Session.name], term))
+
+        sessions = _apply_paging(query.order_by(Session.id)).all()
         return jsonify([{
             "id": s.id,
             "name": s.name,
@@ -363,6 +1014,8 @@ def get_all_sessions():
             "created_at": s.created_at.strftime("%Y-%m-%d %H:%M:%S")
         } for s in sessions]), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error fetching sessions: {e}")
         return jsonify({"error": "An error occurred while fetching sessions."}), 500
@@ -387,14 +1040,29 @@ def delete_user(user_id):
         if user_to_delete.role == 'admin':
             return jsonify({"error": "Cannot delete an admin user"}), 403
 
-        # Delete related records (e.g., attendance, sessions)
+        # Large cascades can outlast the proxy timeout; hand them to a worker
+        if request.args.get('background') == '1':
+            job = submit('delete_user', {'user_id': user_id}, submitted_by=current_user_id)
+            return _job_accepted(job)
+
+        # Delete related records (e.g., attendance, sessions, courses)
         Attendance.query.filter_by(student_id=user_id).delete()
         Session.query.filter_by(instructor_id=user_id).delete()
+        Enrollment.query.filter_by(student_id=user_id).delete()
+        course_ids = [c for (c,) in db.session.query(Course.id).filter_by(instructor_id=user_id)]
+        if course_ids:
+            Enrollment.query.filter(Enrollment.course_id.in_(course_ids)).delete(synchronize_session=False)
+            Course.query.filter(Course.id.in_(course_ids)).delete(synchronize_session=False)
 
         # Delete the user
         db.session.delete(user_to_delete)
         db.session.commit()
 
+        # Their check-ins and sessions may be cached anywhere; start afresh
+        cache = checkin_cache()
+        if cache:
+            cache.invalidate()
+
         return jsonify({"message": "User deleted successfully"}), 200
 
     except Exception as e:
@@ -422,9 +1090,14 @@ def delete_session(session_id):
         Attendance.query.filter_by(session_id=session_to_delete.session_id).delete()
 
         # Delete the session
+        cache_key = (session_to_delete.institution_id, session_to_delete.session_id)
         db.session.delete(session_to_delete)
         db.session.commit()
 
+        cache = checkin_cache()
+        if cache:
+            cache.invalidate(*cache_key)
+
         return jsonify({"message": "Session deleted successfully"}), 200
 
     except Exception as e:
@@ -449,12 +1122,248 @@ def delete_attendance(attendance_id):
             return jsonify({"error": "Attendance record not found"}), 404
 
         # Delete the attendance record
+        cache_key = (attendance_to_delete.institution_id, attendance_to_delete.session_id)
         db.session.delete(attendance_to_delete)
         db.session.commit()
 
+        # The student may check in again, so drop the cached seen set
+        cache = checkin_cache()
+        if cache:
+            cache.invalidate(*cache_key)
+
         return jsonify({"message": "Attendance record deleted successfully"}), 200
 
     except Exception as e:
         db.session.rollback()
         print(f"Error deleting attendance record: {e}")
-        return jsonify({"error": "An error occurred while deleting the attendance record."}), 500
\ No newline at end of file
+        return jsonify({"error": "An error occurred while deleting the attendance record."}), 500
+
+# Recent request profiles of the admin's institution on this worker (Admin only)
+@routes_bp.route('/api/admin/profiles', methods=['GET'])
+@jwt_required()
+def get_profiles():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "Only admins can view profiles"}), 403
+
+        # Summaries only; fetch one profile for its functions and SQL
+        summary_keys = ("id", "method", "path", "endpoint", "status", "trigger",
+                        "duration_ms", "sql_count", "sql_ms", "recorded_at")
+        return jsonify([
+            {key: p[key] for key in summary_keys} for p in profile_store().list(current_institution())
+        ]), 200
+
+    except Exception as e:
+        print(f"Error fetching profiles: {e}")
+        return jsonify({"error": "An error occurred while fetching profiles."}), 500
+
+# One profile's top functions and SQL statements (Admin only)
+@routes_bp.route('/api/admin/profiles/<string:profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "Only admins can view profiles"}), 403
+
+        profile = profile_store().get(profile_id, current_institution())
+        if not profile:
+            return jsonify({"error": "Profile not found"}), 404
+        return jsonify({key: value for key, value in profile.items() if key != "folded"}), 200
+
+    except Exception as e:
+        print(f"Error fetching profile: {e}")
+        return jsonify({"error": "An error occurred while fetching the profile."}), 500
+
+# Collapsed stacks for flamegraph.pl / speedscope (Admin only)
+@routes_bp.route('/api/admin/profiles/<string:profile_id>/flamegraph', methods=['GET'])
+@jwt_required()
+def get_profile_flamegraph(profile_id):
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "Only admins can view profiles"}), 403
+
+        profile = profile_store().get(profile_id, current_institution())
+        if not profile:
+            return jsonify({"error": "Profile not found"}), 404
+        return send_file(BytesIO(profile["folded"].encode()), mimetype="text/plain",
+                         as_attachment=True, download_name=f"profile_{profile_id}.folded")
+
+    except Exception as e:
+        print(f"Error fetching flamegraph: {e}")
+        return jsonify({"error": "An error occurred while fetching the flamegraph."}), 500
+
+
+### JOB ROUTES ###
+
+def _job_accepted(job):
+    """202 response pointing the client at the job's status URL."""
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}"
+    }), 202
+
+def _job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "result": job.result,
+        "result_location": f"/api/jobs/{job.id}/result" if job.result_location else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def _visible_job(job_id):
+    """The job if the caller is an admin or submitted it, else None."""
+    current_user_id = get_jwt_identity()
+    user = User.query.filter_by(user_id=current_user_id).first()
+    job = Job.query.filter_by(id=job_id).first()
+    if not user or not job or (user.role != 'admin' and job.submitted_by != current_user_id):
+        return None
+    return job
+
+# Submit a background job (Admin only)
+@routes_bp.route('/api/jobs', methods=['POST'])
+@jwt_required()
+def submit_job():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "Only admins can submit jobs"}), 403
+
+        data = request.get_json() or {}
+        kind = data.get('kind')
+        if kind not in HANDLERS:
+            return jsonify({"error": f"Unknown job kind. Use one of: {', '.join(sorted(HANDLERS))}"}), 400
+        payload = data.get('payload') or {}
+        if not isinstance(payload, dict):
+            return jsonify({"error": "payload must be an object."}), 400
+
+        job = submit(kind, payload, submitted_by=current_user_id)
+        return _job_accepted(job)
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error submitting job: {e}")
+        return jsonify({"error": "An error occurred while submitting the job."}), 500
+
+# Poll a job's progress
+@routes_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    try:
+        job = _visible_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(_job_to_dict(job)), 200
+
+    except Exception as e:
+        print(f"Error fetching job: {e}")
+        return jsonify({"error": "An error occurred while fetching the job."}), 500
+
+# Download a finished job's output file
+@routes_bp.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+@jwt_required()
+def get_job_result(job_id):
+    try:
+        job = _visible_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        if job.status != JobStatus.SUCCEEDED.value or not job.result_location:
+            return jsonify({"error": "Job has no result file"}), 404
+        if not os.path.exists(job.result_location):
+            return jsonify({"error": "Result file has been removed"}), 410
+        return send_file(job.result_location, as_attachment=True,
+                         download_name=os.path.basename(job.result_location))
+
+    except Exception as e:
+        print(f"Error fetching job result: {e}")
+        return jsonify({"error": "An error occurred while fetching the job result."}), 500
+
+
+### CHANGE FEED ROUTES ###
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+
+# Changes to attendance, sessions and users since a version (Admins and instructors)
+@routes_bp.route('/api/changes', methods=['GET'])
+@jwt_required()
+@read_only
+def get_changes():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.filter_by(user_id=current_user_id).first()
+        if not user or user.role not in ('admin', 'instructor'):
+            return jsonify({"error": "Only admins and instructors can sync changes"}), 403
+
+        query = db.session.query(ChangeLog.id)
+        # Instructors see changes to their own sessions and their check-ins
+        if user.role == 'instructor':
+            query = query.filter(ChangeLog.owner_id == user.user_id)
+
+        # Tombstones at or below the floor were compacted away
+        floor = db.session.query(ChangeLogFloor.version).scalar() or 0
+
+        # Without ?since= just report where the feed is: clients take this
+        # version, download the full lists once, then poll from it
+        if request.args.get('since') is None:
+            latest = query.with_entities(func.max(ChangeLog.id)).scalar() or 0
+            return jsonify({"changes": [], "next_since": max(latest, floor), "has_more": False}), 200
+
+        try:
+            since = int(request.args['since'])
+            limit = int(request.args.get('limit', CHANGES_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({"error": "since and limit must be integers."}), 400
+        if since < 0 or limit < 1:
+            return jsonify({"error": "since must be >= 0 and limit >= 1."}), 400
+        limit = min(limit, CHANGES_MAX_LIMIT)
+
+        if since < floor:
+            return jsonify({
+                "error": "Changes since this version are no longer available; download everything again.",
+                "min_since": floor
+            }), 410
+
+        entities = [e for e in request.args.get('entity', '').split(',') if e]
+        if entities:
+            query = query.filter(ChangeLog.entity.in_(entities))
+        rows = (
+            query.with_entities(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_key, ChangeLog.op,
+                                ChangeLog.data, ChangeLog.created_at)
+            .filter(ChangeLog.id > since)
+            .order_by(ChangeLog.id)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            "changes": [{
+                "version": row.id,
+                "entity": row.entity,
+                "key": row.entity_key,
+                "op": row.op,
+                "data": row.data,
+                "changed_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            } for row in rows],
+            "next_since": rows[-1].id if rows else since,
+            "has_more": has_more
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching changes: {e}")
+        return jsonify({"error": "An error occurred while fetching changes."}), 500
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions.extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh SQLite file, with an app context pushed."""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "JOB_RESULTS_DIR": str(tmp_path / "job_results"),
+        "JOB_CONCURRENCY": {"test_ok": 1},
+        "JOB_STALE_SECONDS": 60,
+        "JWT_SECRET_KEY": "test-only-jwt-secret-key-32-bytes",
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,45 @@
+from flask_jwt_extended import create_access_token
+
+from extensions.extensions import db
+from models.models import Attendance, Session, User
+
+
+def _check_in(client, user_id, session_id="12345"):
+    token = create_access_token(identity=user_id)
+    return client.post("/api/attendance", json={"session_id": session_id},
+                       headers={"Authorization": f"Bearer {token}"})
+
+
+def _setup():
+    db.session.add(User(username="ins", email="ins@example.com", password="x", role="instructor",
+                        user_id="ins_1"))
+    db.session.add(Session(session_id="12345", name="Lecture", instructor_id="ins_1"))
+    for i in range(2):
+        db.session.add(User(username=f"s{i}", email=f"s{i}@example.com", password="x", role="student",
+                            user_id=f"stu_{i}"))
+    db.session.commit()
+
+
+def test_cached_session_deleted_elsewhere_is_rejected(app):
+    _setup()
+    client = app.test_client()
+    assert _check_in(client, "stu_0").status_code == 201
+
+    # Deleted through another worker, so this worker's cache still says valid
+    Attendance.query.delete()
+    Session.query.delete()
+    db.session.commit()
+
+    assert _check_in(client, "stu_1").status_code == 400
+    assert Attendance.query.count() == 0
+
+
+def test_deleted_student_is_not_answered_from_the_cache(app):
+    _setup()
+    client = app.test_client()
+    assert _check_in(client, "stu_0").status_code == 201
+
+    User.query.filter_by(user_id="stu_0").delete()
+    db.session.commit()
+
+    assert _check_in(client, "stu_0").status_code == 403
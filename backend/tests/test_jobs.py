@@ -0,0 +1,212 @@
+import csv
+from datetime import datetime, timedelta
+
+from werkzeug.security import check_password_hash
+
+from extensions.extensions import db
+from jobs import handlers
+from jobs.runner import claim, job_handler, recover_stale, run, submit
+from models.models import Attendance, Job, JobStatus, Session, User
+
+
+@job_handler("test_ok")
+def _ok(ctx):
+    ctx.result = {"attempt": ctx.attempt}
+
+
+@job_handler("test_flaky")
+def _flaky(ctx):
+    if ctx.attempt == 1:
+        raise RuntimeError("first attempt fails")
+    ctx.result = {"attempt": ctx.attempt}
+
+
+@job_handler("test_broken")
+def _broken(ctx):
+    raise RuntimeError("always fails")
+
+
+def _job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+
+def _make_runnable(job_id):
+    """Skip the retry backoff."""
+    db.session.execute(db.update(Job).where(Job.id == job_id).values(run_after=datetime.utcnow()))
+    db.session.commit()
+
+
+def test_claim_takes_oldest_job_and_marks_it_running(app):
+    first = submit("test_flaky", {}).id
+    submit("test_flaky", {})
+
+    assert claim("w1") == first
+    job = _job(first)
+    assert job.status == JobStatus.RUNNING.value
+    assert job.locked_by == "w1"
+    assert job.attempts == 1
+    assert job.heartbeat_at is not None
+
+
+def test_claim_returns_none_when_queue_is_empty(app):
+    assert claim("w1") is None
+
+
+def test_claim_respects_kind_limit(app):
+    # JOB_CONCURRENCY allows one running test_ok job
+    first = submit("test_ok", {}).id
+    second = submit("test_ok", {}).id
+    other = submit("test_flaky", {}).id
+
+    assert claim("w1") == first
+    # The second test_ok job waits; a job of another kind is taken instead
+    assert claim("w2") == other
+    assert claim("w3") is None
+    assert _job(second).status == JobStatus.QUEUED.value
+
+    assert run(first)
+    assert claim("w3") == second
+
+
+def test_claim_skips_jobs_waiting_for_backoff(app):
+    job_id = submit("test_ok", {}).id
+    db.session.execute(db.update(Job).where(Job.id == job_id)
+                       .values(run_after=datetime.utcnow() + timedelta(minutes=5)))
+    db.session.commit()
+
+    assert claim("w1") is None
+
+
+def test_run_records_result(app):
+    job_id = submit("test_ok", {}).id
+    claim("w1")
+
+    assert run(job_id)
+    job = _job(job_id)
+    assert job.status == JobStatus.SUCCEEDED.value
+    assert job.progress == 100
+    assert job.result == {"attempt": 1}
+    assert job.locked_by is None
+
+
+def test_failed_attempt_is_retried_with_backoff(app):
+    job_id = submit("test_flaky", {}).id
+    claim("w1")
+    before = datetime.utcnow()
+
+    assert not run(job_id)
+    job = _job(job_id)
+    assert job.status == JobStatus.QUEUED.value
+    assert "first attempt fails" in job.error
+    # 2 ** attempts seconds after the first failure
+    assert job.run_after >= before + timedelta(seconds=2)
+    assert claim("w1") is None
+
+    _make_runnable(job_id)
+    assert claim("w2") == job_id
+    assert run(job_id)
+    job = _job(job_id)
+    assert job.status == JobStatus.SUCCEEDED.value
+    assert job.result == {"attempt": 2}
+    assert job.error is None
+
+
+def test_job_fails_after_max_attempts(app):
+    job_id = submit("test_broken", {}, max_attempts=2).id
+    for _ in range(2):
+        _make_runnable(job_id)
+        assert claim("w1") == job_id
+        assert not run(job_id)
+
+    job = _job(job_id)
+    assert job.status == JobStatus.FAILED.value
+    assert job.attempts == 2
+    assert job.finished_at is not None
+    _make_runnable(job_id)
+    assert claim("w1") is None
+
+
+def test_recover_stale_requeues_jobs_without_heartbeat(app):
+    stale = submit("test_ok", {}).id
+    live = submit("test_flaky", {}).id
+    claim("w1")
+    claim("w2")
+    db.session.execute(db.update(Job).where(Job.id == stale)
+                       .values(heartbeat_at=datetime.utcnow() - timedelta(seconds=120)))
+    db.session.commit()
+
+    assert recover_stale() == 1
+    job = _job(stale)
+    assert job.status == JobStatus.QUEUED.value
+    assert job.locked_by is None
+    assert "w1 stopped responding" in job.error
+    assert _job(live).status == JobStatus.RUNNING.value
+
+    # Once the backoff passes another worker finishes it
+    _make_runnable(stale)
+    assert claim("w3") == stale
+    assert run(stale)
+    assert _job(stale).result == {"attempt": 2}
+
+
+def test_recover_stale_fails_job_out_of_attempts(app):
+    job_id = submit("test_ok", {}, max_attempts=1).id
+    claim("w1")
+    db.session.execute(db.update(Job).where(Job.id == job_id)
+                       .values(heartbeat_at=datetime.utcnow() - timedelta(seconds=120)))
+    db.session.commit()
+
+    assert recover_stale() == 1
+    assert _job(job_id).status == JobStatus.FAILED.value
+
+
+def test_import_users_payload_is_stored_without_passwords(app):
+    job_id = submit("import_users", {"users": [
+        {"username": "ada", "email": "ada@example.com", "password": "s3cret-pw", "role": "student"},
+    ]}).id
+    assert "s3cret-pw" not in str(_job(job_id).payload)
+
+    claim("w1")
+    assert run(job_id)
+    user = User.query.filter_by(email="ada@example.com").one()
+    assert check_password_hash(user.password, "s3cret-pw")
+
+
+def test_import_users_reports_taken_usernames(app):
+    db.session.add(User(username="ada", email="ada@example.com", password="x", role="student",
+                        user_id="stu_1"))
+    db.session.commit()
+    job_id = submit("import_users", {"users": [
+        {"username": "ada", "email": "other@example.com", "password": "pw", "role": "student"},
+        {"username": "bob", "email": "bob@example.com", "password": "pw", "role": "student"},
+        {"username": "bob", "email": "bob2@example.com", "password": "pw", "role": "student"},
+    ]}).id
+    claim("w1")
+    assert run(job_id)
+    assert _job(job_id).result == {"created": 1, "skipped": 0, "errors": [
+        {"row": 0, "error": "Username already taken."},
+        {"row": 2, "error": "Username already taken."},
+    ]}
+    assert User.query.filter_by(username="bob").one().email == "bob@example.com"
+
+
+def test_export_attendance_writes_every_batch(app, monkeypatch):
+    monkeypatch.setattr(handlers, "BATCH_SIZE", 2)
+    db.session.add(User(username="ins", email="ins@example.com", password="x", role="instructor",
+                        user_id="ins_1"))
+    db.session.add(Session(session_id="12345", name="Lecture", instructor_id="ins_1"))
+    for i in range(5):
+        db.session.add(User(username=f"s{i}", email=f"s{i}@example.com", password="x", role="student",
+                            user_id=f"stu_{i}"))
+        db.session.add(Attendance(student_id=f"stu_{i}", session_id="12345"))
+    db.session.commit()
+
+    job_id = submit("export_attendance", {}).id
+    claim("w1")
+    assert run(job_id)
+    job = _job(job_id)
+    with open(job.result_location, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["student_id"] for r in rows] == [f"stu_{i}" for i in range(5)]
+    assert job.result == {"rows": 5}
@@ -0,0 +1,45 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from extensions.extensions import db
+from models.models import Institution, User
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "JWT_SECRET_KEY": "test-only-jwt-secret-key-32-bytes",
+        "PROFILING_ENABLED": True,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Institution(code="other", name="Other"))
+        db.session.add(User(username="a", email="a@example.com", password="x", role="admin",
+                            user_id="adm_1", institution_id="default"))
+        db.session.add(User(username="b", email="b@example.com", password="x", role="admin",
+                            user_id="adm_2", institution_id="other"))
+        db.session.commit()
+        yield app.test_client()
+        db.session.remove()
+
+
+def _headers(user_id, institution):
+    token = create_access_token(identity=user_id,
+                                additional_claims={"role": "admin", "institution": institution})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_admins_only_see_their_institutions_profiles(client):
+    own, other = _headers("adm_1", "default"), _headers("adm_2", "other")
+    client.get("/api/sessions", headers={**own, "X-Profile": "1"})
+
+    profiles = client.get("/api/admin/profiles", headers=own).get_json()
+    assert len(profiles) == 1
+    profile_id = profiles[0]["id"]
+    assert client.get(f"/api/admin/profiles/{profile_id}", headers=own).status_code == 200
+
+    assert client.get("/api/admin/profiles", headers=other).get_json() == []
+    assert client.get(f"/api/admin/profiles/{profile_id}", headers=other).status_code == 404
+    assert client.get(f"/api/admin/profiles/{profile_id}/flamegraph", headers=other).status_code == 404
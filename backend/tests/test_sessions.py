@@ -0,0 +1,27 @@
+from flask_jwt_extended import create_access_token
+
+from extensions.extensions import db
+from models.models import Course, User
+
+
+def _create(client, user_id, body):
+    token = create_access_token(identity=user_id)
+    return client.post("/api/sessions", json=body, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_create_session_checks_the_course(app):
+    for i in (1, 2):
+        db.session.add(User(username=f"ins{i}", email=f"ins{i}@example.com", password="x",
+                            role="instructor", user_id=f"ins_{i}"))
+    db.session.add(Course(code="CS101", name="Intro", instructor_id="ins_2"))
+    db.session.commit()
+    course_id = Course.query.one().id
+    client = app.test_client()
+
+    assert _create(client, "ins_1", {"name": "Lecture", "course_id": "abc"}).status_code == 400
+    # Another instructor's course
+    assert _create(client, "ins_1", {"name": "Lecture", "course_id": course_id}).status_code == 404
+
+    response = _create(client, "ins_2", {"name": "Lecture", "course_id": str(course_id)})
+    assert response.status_code == 201
+    assert response.get_json()["course_id"] == course_id
@@ -0,0 +1,19 @@
+// Read-your-writes with a read replica: the API marks responses to writes with
+// an X-Last-Write header. Sending it back on the next reads keeps them on the
+// primary for a few seconds, whichever server worker answers.
+const STORAGE_KEY = "lastWrite";
+
+// Remember the marker from a fetch Response's or an axios response's headers
+export const rememberWrite = (headers) => {
+    if (!headers) return;
+    const marker = typeof headers.get === "function" ? headers.get("X-Last-Write") : headers["x-last-write"];
+    if (marker) {
+        sessionStorage.setItem(STORAGE_KEY, marker);
+    }
+};
+
+// Headers to add to reads
+export const lastWriteHeader = () => {
+    const marker = sessionStorage.getItem(STORAGE_KEY);
+    return marker ? { "X-Last-Write": marker } : {};
+};
@@ -1,8 +1,21 @@
 import React, { useState, useEffect } from "react";
 import axios from "axios";
+import { lastWriteHeader, rememberWrite } from "../lastWrite";
 import { useNavigate } from "react-router-dom";
 import "../App.css";
 
+// Wait until typing pauses before sending a search
+const SEARCH_DEBOUNCE_MS = 300;
+
+const useDebounced = (value, delay) => {
+    const [debounced, setDebounced] = useState(value);
+    useEffect(() => {
+        const timer = setTimeout(() => setDebounced(value), delay);
+        return () => clearTimeout(timer);
+    }, [value, delay]);
+    return debounced;
+};
+
 const AdminDashboard = () => {
     const [activeFeature, setActiveFeature] = useState("manageUsers"); // Default feature
     const [users, setUsers] = useState([]);
@@ -10,41 +23,61 @@ const AdminDashboard = () => {
     const [sessions, setSessions] = useState([]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState("");
+    const [userFilters, setUserFilters] = useState({ role: "", q: "" });
+    const [recordFilters, setRecordFilters] = useState({ q: "", from: "", to: "" });
     const navigate = useNavigate();
+    const debouncedUserFilters = useDebounced(userFilters, SEARCH_DEBOUNCE_MS);
+    const debouncedRecordFilters = useDebounced(recordFilters, SEARCH_DEBOUNCE_MS);
 
     // Fetch data based on the active feature
     useEffect(() => {
+        // Cancelled when the filters change again, so a slow earlier
+        // response can never overwrite newer results
+        const controller = new AbortController();
         const fetchData = async () => {
             setLoading(true);
             setError("");
             try {
                 const token = localStorage.getItem("token");
+                // Send only the filters that are set so the server returns matching rows
+                const activeParams = (filters) =>
+                    Object.fromEntries(Object.entries(filters).filter(([, value]) => value));
                 if (activeFeature === "manageUsers") {
                     const response = await axios.get("https://classattendanceqrcodesystem.onrender.com/api/users", {
-                        headers: { Authorization: `Bearer ${token}` },
+                        headers: { Authorization: `Bearer ${token}`, ...lastWriteHeader() },
+                        params: activeParams(debouncedUserFilters),
+                        signal: controller.signal,
                     });
+                    if (controller.signal.aborted) return;
                     setUsers(response.data);
                 } else if (activeFeature === "manageRecords") {
                     const [attendanceRes, sessionsRes] = await Promise.all([
                         axios.get("https://classattendanceqrcodesystem.onrender.com/api/attendance", {
-                            headers: { Authorization: `Bearer ${token}` },
+                            headers: { Authorization: `Bearer ${token}`, ...lastWriteHeader() },
+                            params: activeParams(debouncedRecordFilters),
+                            signal: controller.signal,
                         }),
                         axios.get("https://classattendanceqrcodesystem.onrender.com/api/sessions/all", {
-                            headers: { Authorization: `Bearer ${token}` },
+                            headers: { Authorization: `Bearer ${token}`, ...lastWriteHeader() },
+                            params: activeParams(debouncedRecordFilters),
+                            signal: controller.signal,
                         }),
                     ]);
+                    if (controller.signal.aborted) return;
                     setAttendance(attendanceRes.data);
                     setSessions(sessionsRes.data);
                 }
             } catch (error) {
+                if (axios.isCancel(error)) return;
                 console.error("Error fetching data:", error);
                 setError("Failed to fetch data.");
             } finally {
-                setLoading(false);
+                if (!controller.signal.aborted) setLoading(false);
             }
         };
         fetchData();
-    }, [activeFeature]);
+        return () => controller.abort();
+    }, [activeFeature, debouncedUserFilters, debouncedRecordFilters]);
 
     // Handle logout
     const handleLogout = () => {
@@ -59,9 +92,10 @@ const AdminDashboard = () => {
         if (window.confirm("Are you sure you want to delete this user?")) {
             try {
                 const token = localStorage.getItem("token");
-                await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/users/${userId}`, {
+                const response = await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/users/${userId}`, {
                     headers: { Authorization: `Bearer ${token}` },
                 });
+                rememberWrite(response.headers);
                 setUsers(users.filter((user) => user.user_id !== userId));
                 alert("User deleted successfully!");
             } catch (error) {
@@ -75,9 +109,10 @@ const AdminDashboard = () => {
         if (window.confirm("Are you sure you want to delete this session?")) {
             try {
                 const token = localStorage.getItem("token");
-                await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/sessions/${sessionId}`, {
+                const response = await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/sessions/${sessionId}`, {
                     headers: { Authorization: `Bearer ${token}` },
                 });
+                rememberWrite(response.headers);
                 setSessions(sessions.filter((session) => session.id !== sessionId));
                 alert("Session deleted successfully!");
             } catch (error) {
@@ -91,9 +126,10 @@ const AdminDashboard = () => {
         if (window.confirm("Are you sure you want to delete this attendance record?")) {
             try {
                 const token = localStorage.getItem("token");
-                await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/attendance/${attendanceId}`, {
+                const response = await axios.delete(`https://classattendanceqrcodesystem.onrender.com/api/attendance/${attendanceId}`, {
                     headers: { Authorization: `Bearer ${token}` },
                 });
+                rememberWrite(response.headers);
                 setAttendance(attendance.filter((record) => record.id !== attendanceId));
                 alert("Attendance record deleted successfully!");
             } catch (error) {
@@ -133,6 +169,23 @@ const AdminDashboard = () => {
             {activeFeature === "manageUsers" && (
                 <div>
                     <h2>Manage Users</h2>
+                    <div className="filters">
+                        <select
+                            value={userFilters.role}
+                            onChange={(e) => setUserFilters({ ...userFilters, role: e.target.value })}
+                        >
+                            <option value="">All roles</option>
+                            <option value="student">Students</option>
+                            <option value="instructor">Instructors</option>
+                            <option value="admin">Admins</option>
+                        </select>
+                        <input
+                            type="text"
+                            placeholder="Search username or email"
+                            value={userFilters.q}
+                            onChange={(e) => setUserFilters({ ...userFilters, q: e.target.value })}
+                        />
+                    </div>
                     <table>
                         <thead>
                             <tr>
@@ -165,6 +218,24 @@ const AdminDashboard = () => {
             {activeFeature === "manageRecords" && (
                 <div>
                     <h2>Manage Records</h2>
+                    <div className="filters">
+                        <input
+                            type="text"
+                            placeholder="Search session name"
+                            value={recordFilters.q}
+                            onChange={(e) => setRecordFilters({ ...recordFilters, q: e.target.value })}
+                        />
+                        <input
+                            type="date"
+                            value={recordFilters.from}
+                            onChange={(e) => setRecordFilters({ ...recordFilters, from: e.target.value })}
+                        />
+                        <input
+                            type="date"
+                            value={recordFilters.to}
+                            onChange={(e) => setRecordFilters({ ...recordFilters, to: e.target.value })}
+                        />
+                    </div>
                     <h3>Attendance Records</h3>
                     <table>
                         <thead>
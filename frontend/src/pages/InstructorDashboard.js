@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import { QRCodeCanvas } from "qrcode.react";
+import { lastWriteHeader, rememberWrite } from "../lastWrite";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "https://classattendanceqrcodesystem.onrender.com";
 
@@ -40,6 +41,7 @@ const InstructorDashboard = () => {
                 headers: {
                     Authorization: `Bearer ${token}`,
                     "Content-Type": "application/json",
+                    ...lastWriteHeader(),
                 },
             });
 
@@ -94,6 +96,8 @@ const InstructorDashboard = () => {
                 throw new Error(errorData.message || "Failed to create session");
             }
 
+            // So the refresh below sees the new session even on a stale replica
+            rememberWrite(response.headers);
             const data = await response.json();
             console.log("Created Session:", data);
             setSessionName("");
@@ -133,6 +137,7 @@ const InstructorDashboard = () => {
                 headers: {
                     Authorization: `Bearer ${token}`,
                     "Content-Type": "application/json",
+                    ...lastWriteHeader(),
                 },
             });
 